@@ -0,0 +1,142 @@
+// Client-side rendering for WEATHER_CLIENTSIDE=1: the server ships packed forecast arrays into
+// dcc.Store and the graph and table are built here, so revisiting a loaded city needs no server call.
+(function () {
+    function component(namespace, type, props) {
+        return {namespace: namespace, type: type, props: props};
+    }
+
+    function html(type, props) {
+        return component('dash_html_components', type, props);
+    }
+
+    function dbc(type, props) {
+        return component('dash_bootstrap_components', type, props);
+    }
+
+    // Base64 little-endian float32 -> Float32Array
+    function unpack(encoded) {
+        var binary = atob(encoded);
+        var bytes = new Uint8Array(binary.length);
+        for (var i = 0; i < binary.length; i++) {
+            bytes[i] = binary.charCodeAt(i);
+        }
+        return new Float32Array(bytes.buffer);
+    }
+
+    function formatValue(value) {
+        return String(Number(value.toPrecision(6)));
+    }
+
+    function formatAge(seconds) {
+        var minutes = Math.floor(seconds / 60);
+        if (minutes < 60) {
+            return minutes + ' min ago';
+        }
+        return Math.floor(minutes / 60) + ' h ' + (minutes % 60) + ' min ago';
+    }
+
+    function isFresh(entry) {
+        return entry && !entry.error && entry.expires * 1000 > Date.now();
+    }
+
+    function renderCard(city, entry) {
+        var times = [];
+        for (var i = 0; i < entry.count; i++) {
+            times.push(new Date((entry.start + i * entry.interval) * 1000).toISOString());
+        }
+        var cloudCover = unpack(entry.variables.cloud_cover);
+        var dewPoint = unpack(entry.variables.dew_point_2m);
+        var precipitation = unpack(entry.variables.precipitation_probability);
+
+        var figure = {
+            data: [{type: 'scatter', mode: 'lines', x: times, y: Array.from(dewPoint)}],
+            layout: {
+                title: {text: '24-Hour Temperature Trend'},
+                xaxis: {title: {text: 'Time'}},
+                yaxis: {title: {text: 'Temperature (°C)'}},
+                plot_bgcolor: 'white',
+                paper_bgcolor: 'white',
+                margin: {t: 30, b: 30, l: 30, r: 30}
+            }
+        };
+
+        var rows = [];
+        for (var row = 0; row < Math.min(5, entry.count); row++) {
+            rows.push(html('Tr', {children: [
+                html('Td', {children: times[row].slice(11, 16)}),
+                html('Td', {children: [html('I', {className: 'fas fa-cloud me-2'}), formatValue(cloudCover[row]) + '%']}),
+                html('Td', {children: [html('I', {className: 'fas fa-thermometer-half me-2'}), formatValue(dewPoint[row]) + '°C']}),
+                html('Td', {children: [html('I', {className: 'fas fa-tint me-2'}), formatValue(precipitation[row]) + '%']})
+            ]}));
+        }
+
+        var location = [html('I', {className: 'fas fa-map-marker-alt me-2'}), entry.lat + '°N, ' + entry.lon + '°E'];
+        if (entry.stale) {
+            var age = entry.age + (Date.now() / 1000 - entry.served_at);
+            location.push(html('Div', {
+                className: 'small text-warning',
+                children: [html('I', {className: 'fas fa-history me-2'}), 'Updated ' + formatAge(age)]
+            }));
+        }
+
+        return [dbc('Card', {className: 'mb-4 shadow', children: [
+            dbc('CardHeader', {children: dbc('Row', {children: [
+                dbc('Col', {width: 8, children: html('H3', {className: 'text-primary mb-0', children: 'Weather in ' + city})}),
+                dbc('Col', {width: 4, children: html('Div', {className: 'text-muted text-end', children: location})})
+            ]})}),
+            dbc('CardBody', {children: [
+                dbc('Row', {children: dbc('Col', {width: 12, className: 'mb-4', children: component(
+                    'dash_core_components', 'Graph', {figure: figure, config: {displayModeBar: false}}
+                )})}),
+                dbc('Row', {children: dbc('Col', {children: dbc('Table', {
+                    bordered: true, hover: true, responsive: true, striped: true,
+                    children: [
+                        html('Thead', {children: html('Tr', {className: 'table-primary', children: [
+                            html('Th', {children: 'Time'}),
+                            html('Th', {children: 'Cloud Cover'}),
+                            html('Th', {children: 'Temperature'}),
+                            html('Th', {children: 'Precipitation'})
+                        ]})}),
+                        html('Tbody', {children: rows})
+                    ]
+                })})})
+            ]})
+        ]})];
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        weather: {
+            // Ask the server only for cities that are not loaded or have expired
+            requestForecast: function (city, cache) {
+                if (city === null || city === undefined || isFresh((cache || {})[city])) {
+                    return window.dash_clientside.no_update;
+                }
+                return {city: city, requested_at: Date.now()};
+            },
+
+            mergeForecast: function (incoming, cache) {
+                if (!incoming) {
+                    return window.dash_clientside.no_update;
+                }
+                var merged = Object.assign({}, cache);
+                incoming.served_at = Date.now() / 1000;
+                merged[incoming.city] = incoming;
+                return merged;
+            },
+
+            renderForecast: function (city, cache) {
+                if (city === null || city === undefined) {
+                    return html('P', {children: 'Please select a city'});
+                }
+                var entry = (cache || {})[city];
+                if (!entry) {
+                    return window.dash_clientside.no_update;
+                }
+                if (entry.error) {
+                    return dbc('Alert', {color: 'danger', children: 'Error fetching weather data'});
+                }
+                return renderCard(entry.name, entry);
+            }
+        }
+    });
+})();
@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import os
+import aiohttp
+from forecast_cache import forecast_cache, forecast_key
+from upstream_guard import DeadlineExceeded, UpstreamUnavailable, deadline, remaining, upstream_guard
+from weather_client import BACKOFF_FACTOR, RETRIES, RETRY_STATUSES, retry_delay
+from weather_fetcher import (
+    FORECAST_URL, make_projection, parse_responses, projection_params, remember_forecast, resolve_location,
+    response_time, response_to_forecast
+)
+
+logger = logging.getLogger(__name__)
+
+# --------------------------
+# Async Client Configuration
+# --------------------------
+ASYNC_CONCURRENCY = int(os.environ.get('WEATHER_ASYNC_CONCURRENCY', 50))
+ASYNC_CONNECTIONS_PER_HOST = int(os.environ.get('WEATHER_ASYNC_CONNECTIONS_PER_HOST', 20))
+ASYNC_TIMEOUT = float(os.environ.get('WEATHER_ASYNC_TIMEOUT', 30))
+
+
+# --------------------------
+# Async Weather Client
+# --------------------------
+class AsyncWeatherClient:
+    def __init__(self, concurrency=ASYNC_CONCURRENCY, connections_per_host=ASYNC_CONNECTIONS_PER_HOST,
+                 timeout=ASYNC_TIMEOUT):
+        self.concurrency = concurrency
+        self.connections_per_host = connections_per_host
+        self.timeout = timeout
+        self._semaphore = None
+        self._session = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def open(self):
+        if self._session is None:
+            # One connector per client so keep-alive connections are reused across fetches
+            connector = aiohttp.TCPConnector(limit_per_host=self.connections_per_host)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _get(self, params):
+        # Same rate limit, circuit breaker, deadline and retry policy as the threaded client. A
+        # concurrency slot is held only for the round trip; rate-limit waits and backoff sleeps
+        # happen outside it so they do not starve other fetches
+        await self.open()
+        attempt = 0
+        while True:
+            wait = upstream_guard.reserve()
+            if wait:
+                await asyncio.sleep(wait)
+            await self._acquire_slot()
+            try:
+                timeout = aiohttp.ClientTimeout(total=upstream_guard.attempt_timeout(self.timeout))
+                async with self._session.get(FORECAST_URL, params=params, timeout=timeout) as response:
+                    if response.status not in RETRY_STATUSES:
+                        upstream_guard.breaker.record_success()
+                        response.raise_for_status()
+                        return await response.read(), response_time(response)
+                    upstream_guard.breaker.record_failure()
+                    delay = retry_delay(response, attempt)
+                    if attempt >= RETRIES or not upstream_guard.can_wait(delay):
+                        response.raise_for_status()
+            except (aiohttp.ClientResponseError, UpstreamUnavailable):
+                # A passed deadline or an open breaker is not an upstream failure
+                raise
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                upstream_guard.breaker.record_failure()
+                delay = BACKOFF_FACTOR * (2 ** attempt)
+                if attempt >= RETRIES or not upstream_guard.can_wait(delay):
+                    raise
+            finally:
+                self._semaphore.release()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _acquire_slot(self):
+        # Waiting for a free slot counts against the caller's deadline
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), remaining())
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded("Deadline passed waiting for a connection slot") from None
+
+    async def fetch_forecast(self, latitude, longitude, variables=None, forecast_days=None,
+                             forecast_hours=None, force_refresh=False, budget=None):
+        # budget (seconds) bounds slot and rate-limit waits, retries and the request, as in fetch_forecast
+        projection = make_projection(variables, forecast_days, forecast_hours)
+        latitude, longitude = resolve_location(latitude, longitude)
+        key = forecast_key(latitude, longitude, projection)
+        if not force_refresh:
+            forecast = forecast_cache.get(key)
+            if forecast is not None:
+                return forecast
+
+        try:
+            # aiohttp wants flat string values, so list parameters are comma-joined
+            params = {
+                "latitude": str(latitude),
+                "longitude": str(longitude),
+                "format": "flatbuffers"
+            }
+            for name, value in projection_params(projection).items():
+                params[name] = ",".join(value) if isinstance(value, list) else str(value)
+            with deadline(budget):
+                data, fetched_at = await self._get(params)
+            forecast = response_to_forecast(parse_responses(data)[0], projection, fetched_at)
+            remember_forecast(latitude, longitude, projection, forecast)
+            logger.info("Fetched data for %s, %s", latitude, longitude)
+            return forecast
+        except (UpstreamUnavailable, TimeoutError) as e:
+            # Fail-fast rejections are expected while upstream is slow or down
+            logger.warning("Skipped fetch for %s, %s: %s", latitude, longitude, e)
+            return None
+        except Exception as e:
+            logger.error(f"Error fetching weather data: {e}")
+            return None
+
+    async def fetch(self, latitude, longitude, **projection):
+        forecast = await self.fetch_forecast(latitude, longitude, **projection)
+        return forecast.to_dataframe() if forecast is not None else None
+
+    async def fetch_many(self, coords, **projection):
+        # Accepts the same variables/forecast_days/forecast_hours/force_refresh/budget keywords as fetch
+        unique_coords = list(dict.fromkeys((lat, lon) for lat, lon in coords))
+        frames = await asyncio.gather(
+            *(self.fetch(lat, lon, **projection) for lat, lon in unique_coords)
+        )
+        return dict(zip(unique_coords, frames))
+
+
+# --------------------------
+# Module-Level Helpers
+# --------------------------
+async def fetch_weather_data_async(latitude, longitude, client=None, **projection):
+    if client is not None:
+        return await client.fetch(latitude, longitude, **projection)
+    async with AsyncWeatherClient() as owned_client:
+        return await owned_client.fetch(latitude, longitude, **projection)
+
+
+async def fetch_weather_many_async(coords, concurrency=ASYNC_CONCURRENCY, **projection):
+    async with AsyncWeatherClient(concurrency=concurrency) as client:
+        return await client.fetch_many(coords, **projection)
+
+
+def fetch_weather_many(coords, concurrency=ASYNC_CONCURRENCY, **projection):
+    # Synchronous entry point for batch jobs; runs every fetch on one event loop in this thread
+    return asyncio.run(fetch_weather_many_async(coords, concurrency=concurrency, **projection))
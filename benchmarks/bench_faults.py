@@ -0,0 +1,185 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.bench_pipeline import git_commit, percentiles
+from benchmarks.fake_openmeteo import FakeOpenMeteo
+
+# --------------------------
+# Fault Scenario Configuration
+# --------------------------
+VIEW = dict(variables=['dew_point_2m', 'cloud_cover', 'precipitation_probability'], forecast_days=1)
+# Allowed overshoot of the budget: thread scheduling plus decoding after the last byte arrives
+BUDGET_SLACK = 0.25
+
+
+# --------------------------
+# Load Generation
+# --------------------------
+def run_callers(fetch, locations, users, duration, budget):
+    # Dashboard-like callers: every call goes upstream (force_refresh) under the fetch budget
+    stop_at = time.perf_counter() + duration
+    results = []
+
+    def caller(seed):
+        rng = random.Random(seed)
+        local = []
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            forecast = fetch(*rng.choice(locations), force_refresh=True, budget=budget, **VIEW)
+            local.append((time.perf_counter() - start, forecast is not None))
+        return local
+
+    with ThreadPoolExecutor(max_workers=users) as executor:
+        for local in executor.map(caller, range(users)):
+            results.extend(local)
+    return results
+
+
+def summarize(results, elapsed, upstream_requests):
+    ok = [latency for latency, served in results if served]
+    failed = [latency for latency, served in results if not served]
+    return {
+        'calls': len(results),
+        'served': len(ok),
+        'failed': len(failed),
+        'latency': percentiles([latency for latency, _ in results]),
+        'failed_latency': percentiles(failed),
+        'upstream_requests': upstream_requests,
+        'upstream_rps': round(upstream_requests / elapsed, 2) if elapsed else 0.0,
+    }
+
+
+def run_phase(server, fetch, guard, locations, args):
+    before = server.stats()['requests']
+    opened_before = guard.breaker.opened
+    start = time.perf_counter()
+    results = run_callers(fetch, locations, args.users, args.duration, args.budget)
+    elapsed = time.perf_counter() - start
+    summary = summarize(results, elapsed, server.stats()['requests'] - before)
+    summary['over_budget'] = sum(1 for latency, _ in results if latency > args.budget + BUDGET_SLACK)
+    summary['breaker_opened'] = guard.breaker.opened - opened_before
+    summary['guard'] = guard.stats()
+    return summary
+
+
+def time_to_recovery(fetch, locations, budget, limit):
+    # Seconds from the end of an outage until a forced fetch is served again (half-open probe
+    # succeeded and closed the breaker)
+    start = time.perf_counter()
+    while time.perf_counter() - start < limit:
+        if fetch(*locations[0], force_refresh=True, budget=budget, **VIEW) is not None:
+            return round(time.perf_counter() - start, 3)
+        time.sleep(0.05)
+    return None
+
+
+def check_results(results, args):
+    # The latency numbers only mean something if the calls really reached the stand-in
+    problems = []
+    phases = ('healthy', 'flaky', 'outage')
+    over_budget = sum(results[phase]['over_budget'] for phase in phases)
+    if over_budget:
+        problems.append(f"{over_budget} calls exceeded the {args.budget}s budget")
+    for phase in ('healthy', 'flaky'):
+        if not results[phase]['upstream_requests'] or not results[phase]['served']:
+            problems.append(f"the {phase} phase served nothing from upstream")
+    if not results['outage']['upstream_requests']:
+        problems.append("no call reached upstream during the outage")
+    if results['outage']['served']:
+        problems.append(f"{results['outage']['served']} calls were served during the outage")
+    if not results['outage']['breaker_opened']:
+        problems.append("the circuit breaker never opened during the outage")
+    if results['recovery_seconds'] is None:
+        problems.append("calls were not served again after the outage")
+    if results['breaker_after_recovery'] != 'closed':
+        problems.append(f"the circuit breaker is {results['breaker_after_recovery']} after recovery")
+    return problems
+
+
+# --------------------------
+# Entry Point
+# --------------------------
+def main():
+    parser = argparse.ArgumentParser(
+        description='Exercise the rate limiter, circuit breaker and fetch budget against a faulty stand-in'
+    )
+    parser.add_argument('--users', type=int, default=16, help='concurrent simulated callers')
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds per phase')
+    parser.add_argument('--locations', type=int, default=200)
+    parser.add_argument('--budget', type=float, default=1.0, help='per-call fetch budget in seconds')
+    parser.add_argument('--latency', type=float, default=0.02, help='stand-in response latency in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.3, help='error share in the flaky phase')
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--spike-rate', type=float, default=0.1, help='latency spike share in the flaky phase')
+    parser.add_argument('--spike-latency', type=float, default=3.0, help='seconds added to spiked responses')
+    parser.add_argument('--rate-limit', type=float, default=20.0, help='upstream calls per second')
+    parser.add_argument('--rate-burst', type=int, default=10)
+    parser.add_argument('--breaker-threshold', type=int, default=5)
+    parser.add_argument('--breaker-reset', type=float, default=2.0)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default='bench_faults.json', help='machine-readable results file')
+    args = parser.parse_args()
+
+    with FakeOpenMeteo(latency=args.latency, error_status=args.error_status, seed=args.seed) as server, \
+            tempfile.TemporaryDirectory() as cache_dir:
+        # Point the fetch layer at the stand-in and configure the guard before they are imported
+        os.environ['WEATHER_FORECAST_URL'] = server.url
+        os.environ['WEATHER_HTTP_CACHE'] = os.path.join(cache_dir, 'bench_cache')
+        os.environ['WEATHER_RATE_LIMIT'] = str(args.rate_limit)
+        os.environ['WEATHER_RATE_BURST'] = str(args.rate_burst)
+        os.environ['WEATHER_BREAKER_THRESHOLD'] = str(args.breaker_threshold)
+        os.environ['WEATHER_BREAKER_RESET'] = str(args.breaker_reset)
+        os.environ.pop('WEATHER_SHARED_CACHE', None)
+        os.environ.pop('WEATHER_STORE_DIR', None)
+        from upstream_guard import upstream_guard
+        from weather_fetcher import fetch_forecast
+
+        rng = random.Random(args.seed)
+        locations = [(round(rng.uniform(-60, 60), 2), round(rng.uniform(-180, 180), 2))
+                     for _ in range(args.locations)]
+        results = {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'timestamp': time.time(),
+            'config': vars(args),
+        }
+
+        results['healthy'] = run_phase(server, fetch_forecast, upstream_guard, locations, args)
+
+        server.error_rate, server.spike_rate, server.spike_latency = \
+            args.error_rate, args.spike_rate, args.spike_latency
+        results['flaky'] = run_phase(server, fetch_forecast, upstream_guard, locations, args)
+        server.error_rate = server.spike_rate = 0.0
+
+        # The outage outlasts the phase, including calls still in flight when it ends, so every
+        # call in it meets a failing upstream; recovery is timed from the moment it ends
+        outage = args.duration + args.budget + BUDGET_SLACK
+        outage_end = time.monotonic() + outage
+        server.outage(outage)
+        results['outage'] = run_phase(server, fetch_forecast, upstream_guard, locations, args)
+        time.sleep(max(0.0, outage_end - time.monotonic()))
+        results['recovery_seconds'] = time_to_recovery(
+            fetch_forecast, locations, args.budget, args.breaker_reset + 2 * args.duration
+        )
+        results['breaker_after_recovery'] = upstream_guard.breaker.stats()['state']
+        results['server'] = server.stats()
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    json.dump(results, sys.stdout, indent=2)
+    print()
+
+    problems = check_results(results, args)
+    for problem in problems:
+        print(f"Invalid run: {problem}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == '__main__':
+    main()
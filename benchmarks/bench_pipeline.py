@@ -0,0 +1,190 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.fake_openmeteo import FakeOpenMeteo
+
+# --------------------------
+# Measurement Helpers
+# --------------------------
+def percentiles(samples):
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def pick(fraction):
+        return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+    return {
+        'count': len(ordered),
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 4),
+        'p50_ms': round(pick(0.50) * 1000, 4),
+        'p95_ms': round(pick(0.95) * 1000, 4),
+        'p99_ms': round(pick(0.99) * 1000, 4),
+        'max_ms': round(ordered[-1] * 1000, 4),
+    }
+
+
+def time_calls(fn, args_list):
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# --------------------------
+# Benchmark Stages
+# --------------------------
+def bench_fetch(app_module, locations, server):
+    from forecast_cache import forecast_cache
+    from weather_client import get_session
+
+    fetch = app_module.fetch_city_forecast
+    results = {}
+
+    def timed_stage(name):
+        before = server.requests
+        results[name] = percentiles(time_calls(fetch, locations))
+        results[name]['upstream_requests'] = server.requests - before
+
+    # Untimed pass so the grid index knows every location's model cell; later fetches use the
+    # cell's coordinates, which would otherwise miss the HTTP cache filled under the query's
+    for coords in locations:
+        fetch(*coords)
+
+    # Cold: nothing in memory or in the HTTP cache, every call reaches the stand-in
+    forecast_cache.clear()
+    get_session().cache.clear()
+    timed_stage('fetch_cold')
+
+    # HTTP-cache warm: SQLite hit plus flatbuffer decode, no network
+    forecast_cache.clear()
+    timed_stage('fetch_http_cache')
+
+    # Memory warm: parsed forecast served from the in-process LRU
+    timed_stage('fetch_memory')
+
+    forecasts = [fetch(*coords) for coords in locations]
+    results['missing_forecasts'] = sum(1 for forecast in forecasts if forecast is None)
+    results['dataframe_build'] = percentiles(
+        time_calls(lambda forecast: forecast.to_dataframe(), [(f,) for f in forecasts if f is not None])
+    )
+    return results
+
+
+def check_results(results):
+    # A failing fetch returns None quickly; timing that as a cache hit would look like a speedup
+    problems = []
+    if results['missing_forecasts']:
+        problems.append(f"{results['missing_forecasts']} locations returned no forecast")
+    if not results['fetch_cold']['upstream_requests']:
+        problems.append("the cold fetch stage made no upstream requests")
+    if results['fetch_http_cache']['upstream_requests'] or results['fetch_memory']['upstream_requests']:
+        problems.append("a warm fetch stage reached upstream")
+    return problems
+
+
+def bench_render(app_module, city_ids):
+    # Data is warm here, so this isolates figure and component-tree construction
+    return {'update_weather': percentiles(time_calls(app_module.update_weather, [(c,) for c in city_ids]))}
+
+
+def bench_concurrent_users(app_module, city_ids, users, duration):
+    from forecast_cache import forecast_cache, stale_cache
+
+    # Every concurrency level starts from the warm HTTP cache only: otherwise later levels are
+    # served stale forecasts and memoized renders left by earlier ones
+    forecast_cache.clear()
+    stale_cache.clear()
+    app_module.render_cache.clear()
+    deadline = time.perf_counter() + duration
+    samples = []
+
+    def simulate_user(seed):
+        rng = random.Random(seed)
+        local = []
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            app_module.update_weather(rng.choice(city_ids))
+            local.append(time.perf_counter() - start)
+        return local
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as executor:
+        for local in executor.map(simulate_user, range(users)):
+            samples.extend(local)
+    elapsed = time.perf_counter() - start
+
+    stats = percentiles(samples)
+    stats['users'] = users
+    stats['throughput_rps'] = round(len(samples) / elapsed, 2) if elapsed else 0.0
+    return stats
+
+
+# --------------------------
+# Entry Point
+# --------------------------
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the fetch-to-render pipeline against a local stand-in')
+    parser.add_argument('--locations', type=int, default=50, help='number of dashboard cities to fetch')
+    parser.add_argument('--users', type=int, nargs='+', default=[1, 4, 16], help='concurrent simulated users')
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds per concurrency level')
+    parser.add_argument('--latency', type=float, default=0.02, help='stand-in response latency in seconds')
+    parser.add_argument('--output', default='bench_results.json', help='machine-readable results file')
+    args = parser.parse_args()
+
+    with FakeOpenMeteo(latency=args.latency) as server, tempfile.TemporaryDirectory() as cache_dir:
+        # Point the fetch layer at the stand-in and a throwaway HTTP cache before it is imported
+        os.environ['WEATHER_FORECAST_URL'] = server.url
+        os.environ['WEATHER_HTTP_CACHE'] = os.path.join(cache_dir, 'bench_cache')
+        os.environ['WEATHER_PREWARM'] = '0'
+        import app as app_module
+
+        selected = list(itertools.islice(app_module.catalog, args.locations))
+        city_ids = [city.id for city in selected]
+        locations = [(city.latitude, city.longitude) for city in selected]
+
+        results = {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'timestamp': time.time(),
+            'config': vars(args),
+        }
+        results.update(bench_fetch(app_module, locations, server))
+        results.update(bench_render(app_module, city_ids))
+        results['concurrent'] = [
+            bench_concurrent_users(app_module, city_ids, users, args.duration) for users in args.users
+        ]
+        results['upstream_requests'] = server.requests
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    json.dump(results, sys.stdout, indent=2)
+    print()
+
+    problems = check_results(results)
+    for problem in problems:
+        print(f"Invalid run: {problem}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == '__main__':
+    main()
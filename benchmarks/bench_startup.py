@@ -0,0 +1,123 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from benchmarks.bench_pipeline import git_commit
+
+# --------------------------
+# Startup Configuration
+# --------------------------
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Modules the serving path defers until first use; any of them loaded at import is a regression
+DEFERRED_MODULES = [
+    'plotly.express', 'pandas', 'pyarrow', 'requests_cache', 'openmeteo_requests', 'retry_requests', 'dash_daq',
+]
+DEFAULT_BUDGET = 2.0
+
+
+# --------------------------
+# Import-Time Measurement
+# --------------------------
+def parse_importtime(stderr):
+    # `python -X importtime` lines: "import time: <self us> | <cumulative us> | <indented name>"
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append({
+            'module': name.strip(),
+            'self_ms': int(self_us) / 1000,
+            'cumulative_ms': int(cumulative_us) / 1000,
+            'depth': depth,
+        })
+    return modules
+
+
+def measure_import(target, env):
+    # Fresh interpreter per run so nothing is already in sys.modules
+    code = (
+        f"import sys, time; start = time.perf_counter(); import {target}; "
+        f"print(time.perf_counter() - start); "
+        f"print('loaded:' + ','.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))"
+    )
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"importing {target} failed:\n{result.stderr[-2000:]}")
+    import_seconds, loaded = result.stdout.strip().splitlines()[-2:]
+    return {
+        'process_seconds': round(wall, 4),
+        'import_seconds': round(float(import_seconds), 4),
+        'deferred_loaded': [name for name in loaded[len('loaded:'):].split(',') if name],
+        'modules': parse_importtime(result.stderr),
+    }
+
+
+def summarize(runs, top):
+    # Median import time across runs; module costs from the median run
+    ordered = sorted(runs, key=lambda run: run['import_seconds'])
+    median = ordered[len(ordered) // 2]
+    top_level = [module for module in median['modules'] if module['depth'] == 0]
+    return {
+        'import_seconds': median['import_seconds'],
+        'process_seconds': median['process_seconds'],
+        'runs': [run['import_seconds'] for run in runs],
+        'deferred_loaded': median['deferred_loaded'],
+        'top_level': sorted(top_level, key=lambda m: m['cumulative_ms'], reverse=True)[:top],
+        'slowest_self': sorted(median['modules'], key=lambda m: m['self_ms'], reverse=True)[:top],
+    }
+
+
+# --------------------------
+# Entry Point
+# --------------------------
+def main():
+    parser = argparse.ArgumentParser(description='Measure cold-start import time against a budget')
+    parser.add_argument('--target', default='app', help='module to import, e.g. app, wsgi or weather_fetcher')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15, help='modules to list per table')
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET, help='maximum median import seconds')
+    parser.add_argument('--output', default='bench_startup.json', help='machine-readable results file')
+    args = parser.parse_args()
+
+    # No warmer, logging or profiling side effects; only the import itself is measured
+    env = dict(os.environ, WEATHER_PREWARM='0', WEATHER_PROFILE='0')
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    # One untimed run so every measured run reads compiled bytecode
+    measure_import(args.target, env)
+    summary = summarize([measure_import(args.target, env) for _ in range(args.runs)], args.top)
+
+    print(f"{args.target}: {summary['import_seconds'] * 1000:.1f} ms import "
+          f"(budget {args.budget * 1000:.0f} ms), {summary['process_seconds'] * 1000:.1f} ms process")
+    print(f"{'module':<48} {'cumulative ms':>14} {'self ms':>10}")
+    for module in summary['top_level']:
+        print(f"{module['module']:<48} {module['cumulative_ms']:>14.1f} {module['self_ms']:>10.1f}")
+    if summary['deferred_loaded']:
+        print(f"Loaded at import but expected to be deferred: {', '.join(summary['deferred_loaded'])}")
+
+    results = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'timestamp': time.time(),
+        'config': vars(args),
+        **summary,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    over_budget = summary['import_seconds'] > args.budget
+    if over_budget:
+        print(f"Over budget by {(summary['import_seconds'] - args.budget) * 1000:.1f} ms")
+    sys.exit(1 if over_budget or summary['deferred_loaded'] else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,282 @@
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+import flatbuffers
+import numpy as np
+import requests
+from openmeteo_sdk.Variable import Variable
+
+# --------------------------
+# Stand-in Configuration
+# --------------------------
+RECORDINGS_DIR = os.path.join(os.path.dirname(__file__), 'recordings')
+UPSTREAM_URL = 'https://api.open-meteo.com/v1/forecast'
+
+# Variable enum ids written into synthesized responses; clients read variables by position
+VARIABLE_IDS = {
+    'precipitation_probability': Variable.precipitation_probability,
+    'cloud_cover': Variable.cloud_cover,
+    'relative_humidity_2m': Variable.relative_humidity,
+    'wind_speed_180m': Variable.wind_speed,
+    'dew_point_2m': Variable.dew_point,
+    'wind_gusts_10m': Variable.wind_gusts,
+    'surface_pressure': Variable.surface_pressure,
+    'pressure_msl': Variable.pressure_msl,
+    'weather_code': Variable.weather_code,
+    'temperature_2m': Variable.temperature,
+}
+
+
+# Table sizes (highest field slot + 1) in the openmeteo_sdk flatbuffers schema
+VARIABLE_WITH_VALUES_FIELDS = 13
+VARIABLES_WITH_TIME_FIELDS = 4
+WEATHER_API_RESPONSE_FIELDS = 15
+
+
+def location_query(latitude, longitude, hourly, forecast_days=None, forecast_hours=None):
+    # Canonical single-location query, used as the recording lookup key
+    params = [('latitude', f"{float(latitude):.4f}"), ('longitude', f"{float(longitude):.4f}"),
+              ('hourly', ','.join(hourly))]
+    if forecast_days:
+        params.append(('forecast_days', str(forecast_days)))
+    if forecast_hours:
+        params.append(('forecast_hours', str(forecast_hours)))
+    return urlencode(params)
+
+
+def recording_path(query, directory=RECORDINGS_DIR):
+    return os.path.join(directory, hashlib.sha1(query.encode()).hexdigest() + '.bin')
+
+
+# --------------------------
+# Synthesized Responses
+# --------------------------
+def synthesize_response(latitude, longitude, hourly, forecast_days=None, forecast_hours=None, now=None):
+    # Deterministic, size-prefixed WeatherApiResponse with plausible hourly curves
+    now = time.time() if now is None else now
+    if forecast_hours:
+        start = int(now // 3600) * 3600
+        count = int(forecast_hours)
+    else:
+        start = int(now // 86400) * 86400
+        count = 24 * int(forecast_days or 7)
+    hours = np.arange(count, dtype=np.float32)
+    phase = (latitude + longitude) % 24
+
+    # Built with the raw builder API; slot numbers follow the openmeteo_sdk schema
+    builder = flatbuffers.Builder(1024 + count * len(hourly) * 4)
+    variable_offsets = []
+    for index, name in enumerate(hourly):
+        values = (50 + 40 * np.sin((hours + phase + index) * (2 * math.pi / 24))).astype(np.float32)
+        values_offset = builder.CreateNumpyVector(values)
+        builder.StartObject(VARIABLE_WITH_VALUES_FIELDS)
+        builder.PrependUint8Slot(0, VARIABLE_IDS.get(name, 0), 0)
+        builder.PrependUOffsetTRelativeSlot(3, values_offset, 0)
+        variable_offsets.append(builder.EndObject())
+
+    builder.StartVector(4, len(variable_offsets), 4)
+    for offset in reversed(variable_offsets):
+        builder.PrependUOffsetTRelative(offset)
+    variables_vector = builder.EndVector()
+
+    builder.StartObject(VARIABLES_WITH_TIME_FIELDS)
+    builder.PrependInt64Slot(0, start, 0)
+    builder.PrependInt64Slot(1, start + count * 3600, 0)
+    builder.PrependInt32Slot(2, 3600, 0)
+    builder.PrependUOffsetTRelativeSlot(3, variables_vector, 0)
+    hourly_offset = builder.EndObject()
+
+    timezone = builder.CreateString('GMT')
+    builder.StartObject(WEATHER_API_RESPONSE_FIELDS)
+    builder.PrependFloat32Slot(0, round(latitude * 10) / 10, 0.0)
+    builder.PrependFloat32Slot(1, round(longitude * 10) / 10, 0.0)
+    builder.PrependFloat32Slot(2, 38.0, 0.0)
+    builder.PrependUOffsetTRelativeSlot(7, timezone, 0)
+    builder.PrependUOffsetTRelativeSlot(8, timezone, 0)
+    builder.PrependUOffsetTRelativeSlot(11, hourly_offset, 0)
+    builder.FinishSizePrefixed(builder.EndObject())
+    return bytes(builder.Output())
+
+
+# --------------------------
+# HTTP Stand-in Server
+# --------------------------
+class FakeOpenMeteo:
+    # Serves /v1/forecast from recordings when present, synthesized flatbuffers otherwise.
+    # Faults for exercising the client's limiter, breaker and deadlines: error_rate answers that
+    # share of requests with error_status (429 also sends Retry-After), spike_rate delays that
+    # share by spike_latency, and outage() fails everything for a while. All can be changed live
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, recordings_dir=RECORDINGS_DIR,
+                 error_rate=0.0, error_status=503, spike_rate=0.0, spike_latency=0.0, seed=None):
+        self.latency = latency
+        self.recordings_dir = recordings_dir
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.spike_rate = spike_rate
+        self.spike_latency = spike_latency
+        self.requests = 0
+        self.errors = 0
+        self.spikes = 0
+        self._outage_until = 0.0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1/forecast"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-openmeteo', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def outage(self, seconds):
+        # Every request fails with error_status for the next `seconds`
+        with self._lock:
+            self._outage_until = time.monotonic() + seconds
+
+    def stats(self):
+        with self._lock:
+            return {'requests': self.requests, 'errors': self.errors, 'spikes': self.spikes}
+
+    def build_body(self, params):
+        latitudes = [float(v) for v in params['latitude'][0].split(',')]
+        longitudes = [float(v) for v in params['longitude'][0].split(',')]
+        hourly = params.get('hourly', [''])[0].split(',')
+        forecast_days = params.get('forecast_days', [None])[0]
+        forecast_hours = params.get('forecast_hours', [None])[0]
+        parts = []
+        for latitude, longitude in zip(latitudes, longitudes):
+            path = recording_path(
+                location_query(latitude, longitude, hourly, forecast_days, forecast_hours), self.recordings_dir
+            )
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    parts.append(f.read())
+            else:
+                parts.append(synthesize_response(latitude, longitude, hourly, forecast_days, forecast_hours))
+        return b''.join(parts)
+
+    def handle(self, handler):
+        with self._lock:
+            self.requests += 1
+            fail = time.monotonic() < self._outage_until or self._random.random() < self.error_rate
+            spike = self._random.random() < self.spike_rate
+            if fail:
+                self.errors += 1
+            if spike:
+                self.spikes += 1
+        delay = self.latency + (self.spike_latency if spike else 0.0)
+        if delay:
+            time.sleep(delay)
+        if fail:
+            self.send_fault(handler)
+            return
+        parsed = urlparse(handler.path)
+        if parsed.path != '/v1/forecast':
+            handler.send_error(404)
+            return
+        # Repeated keys (requests' list encoding) and comma lists are both accepted
+        params = {name: [','.join(values)] for name, values in parse_qs(parsed.query).items()}
+        try:
+            body = self.build_body(params)
+        except (KeyError, ValueError) as e:
+            handler.send_error(400, str(e))
+            return
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'application/octet-stream')
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def send_fault(self, handler):
+        # Same JSON error shape as Open-Meteo, so the client raises its usual errors
+        body = json.dumps({'error': True, 'reason': f"Injected fault {self.error_status}"}).encode()
+        handler.send_response(self.error_status)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(body)))
+        if self.error_status == 429:
+            handler.send_header('Retry-After', '1')
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def _handler_class(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                stand_in.handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+# --------------------------
+# Recording Real Responses
+# --------------------------
+def record(locations, hourly, forecast_days=None, forecast_hours=None, recordings_dir=RECORDINGS_DIR):
+    os.makedirs(recordings_dir, exist_ok=True)
+    for latitude, longitude in locations:
+        query = location_query(latitude, longitude, hourly, forecast_days, forecast_hours)
+        response = requests.get(f"{UPSTREAM_URL}?{query}&format=flatbuffers", timeout=30)
+        response.raise_for_status()
+        with open(recording_path(query, recordings_dir), 'wb') as f:
+            f.write(response.content)
+        print(f"Recorded {latitude}, {longitude} ({len(response.content)} bytes)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local Open-Meteo stand-in for benchmarks')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of requests answered with an error')
+    parser.add_argument('--error-status', type=int, default=503, help='status code of injected errors')
+    parser.add_argument('--spike-rate', type=float, default=0.0, help='share of requests delayed by --spike-latency')
+    parser.add_argument('--spike-latency', type=float, default=0.0, help='seconds added to spiked responses')
+    parser.add_argument('--seed', type=int, help='seed for reproducible fault injection')
+    parser.add_argument('--record', action='store_true', help='record real responses for the dashboard cities')
+    args = parser.parse_args()
+
+    if args.record:
+        from city_catalog import CityCatalog
+        record(CityCatalog().coordinates(), ['dew_point_2m', 'cloud_cover', 'precipitation_probability'], forecast_days=1)
+        return
+
+    with FakeOpenMeteo(port=args.port, latency=args.latency, error_rate=args.error_rate,
+                       error_status=args.error_status, spike_rate=args.spike_rate,
+                       spike_latency=args.spike_latency, seed=args.seed) as server:
+        print(f"Serving fake Open-Meteo at {server.url}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
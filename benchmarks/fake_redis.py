@@ -0,0 +1,147 @@
+import argparse
+import socketserver
+import threading
+import time
+
+# --------------------------
+# Redis Protocol Stand-in
+# --------------------------
+# Speaks enough RESP for the shared cache's Redis backend (GET, SET NX/PX/EX, PEXPIRE, DEL),
+# so cross-process caching can be exercised without a Redis install:
+#   WEATHER_SHARED_CACHE=redis://127.0.0.1:6390/0
+
+
+class FakeRedis:
+    def __init__(self, host='127.0.0.1', port=0):
+        self._data = {}
+        self._lock = threading.Lock()
+        self.commands = 0
+        self._server = socketserver.ThreadingTCPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"redis://{host}:{port}/0"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-redis', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    # ---- commands ----
+    def _live(self, key):
+        entry = self._data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+            del self._data[key]
+            return None
+        return entry
+
+    def execute(self, args):
+        name = args[0].upper()
+        with self._lock:
+            self.commands += 1
+            if name == b'PING':
+                return 'PONG'
+            if name == b'GET':
+                entry = self._live(args[1])
+                return None if entry is None else entry[0]
+            if name == b'SET':
+                key, value, options = args[1], args[2], [arg.upper() for arg in args[3:]]
+                expires_at = None
+                if b'PX' in options:
+                    expires_at = time.monotonic() + int(args[3 + options.index(b'PX') + 1]) / 1000
+                elif b'EX' in options:
+                    expires_at = time.monotonic() + int(args[3 + options.index(b'EX') + 1])
+                if b'NX' in options and self._live(key) is not None:
+                    return None
+                self._data[key] = (value, expires_at)
+                return 'OK'
+            if name == b'PEXPIRE':
+                entry = self._live(args[1])
+                if entry is None:
+                    return 0
+                self._data[args[1]] = (entry[0], time.monotonic() + int(args[2]) / 1000)
+                return 1
+            if name == b'DEL':
+                removed = 0
+                for key in args[1:]:
+                    if self._live(key) is not None:
+                        del self._data[key]
+                        removed += 1
+                return removed
+            if name == b'FLUSHALL':
+                self._data.clear()
+                return 'OK'
+            if name in (b'SELECT', b'CLIENT'):
+                return 'OK'
+        return ValueError(f"ERR unknown command '{name.decode()}'")
+
+    def _handler_class(self):
+        stand_in = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                while True:
+                    args = read_command(self.rfile)
+                    if args is None:
+                        return
+                    self.wfile.write(encode_reply(stand_in.execute(args)))
+                    self.wfile.flush()
+
+        return Handler
+
+
+def read_command(stream):
+    # Commands arrive as RESP arrays of bulk strings: *<n>\r\n($<len>\r\n<bytes>\r\n)*
+    header = stream.readline()
+    if not header:
+        return None
+    if not header.startswith(b'*'):
+        return header.split()
+    args = []
+    for _ in range(int(header[1:])):
+        length = int(stream.readline()[1:])
+        args.append(stream.read(length + 2)[:-2])
+    return args
+
+
+def encode_reply(reply):
+    if reply is None:
+        return b'$-1\r\n'
+    if isinstance(reply, Exception):
+        return b'-' + str(reply).encode() + b'\r\n'
+    if isinstance(reply, str):
+        return f"+{reply}\r\n".encode()
+    if isinstance(reply, int):
+        return b':' + str(reply).encode() + b'\r\n'
+    return b'$' + str(len(reply)).encode() + b'\r\n' + reply + b'\r\n'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local Redis-compatible stand-in for the shared cache')
+    parser.add_argument('--port', type=int, default=6390)
+    args = parser.parse_args()
+
+    with FakeRedis(port=args.port) as server:
+        print(f"Serving fake Redis at {server.url}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
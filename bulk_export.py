@@ -0,0 +1,313 @@
+import argparse
+import csv
+import json
+import logging
+import math
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import numpy as np
+from city_catalog import City, CityCatalog
+from weather_client import POOL_SIZE, configure_client
+from weather_fetcher import fetch_forecast_uncached, make_projection
+from weather_logging import configure_logging
+
+logger = logging.getLogger(__name__)
+
+# --------------------------
+# Export Configuration
+# --------------------------
+EXPORT_WORKERS = int(os.environ.get('WEATHER_EXPORT_WORKERS', 8))
+# Parquet: locations per row group, and per file; a file only counts as done once closed
+ROW_GROUP_LOCATIONS = 100
+FILE_LOCATIONS = 1000
+FORMATS = ('csv', 'ndjson', 'parquet')
+LOCATION_COLUMNS = ['location_id', 'name', 'country', 'latitude', 'longitude']
+
+
+def read_locations(path):
+    # CSV with latitude and longitude columns, and optionally id, name and country; streamed
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            latitude, longitude = float(row['latitude']), float(row['longitude'])
+            location_id = row.get('id') or f"{latitude},{longitude}"
+            yield City(location_id, row.get('name', ''), row.get('country', ''), latitude, longitude)
+
+
+def iso_times(forecast):
+    return np.datetime_as_string(forecast.timestamps().astype('datetime64[s]'), unit='s', timezone='UTC')
+
+
+def nullable(values):
+    # NaN becomes None: an empty CSV field or a JSON null
+    return [None if math.isnan(value) else value for value in values.tolist()]
+
+
+# --------------------------
+# Output Sinks
+# --------------------------
+class TextSink:
+    # Appends each location's rows and flushes; the progress file records the byte offset after
+    # every completed location, so a resumed run truncates away any half-written location
+    def __init__(self, path, variables, offset=None):
+        self.path = path
+        self.variables = list(variables)
+        if offset is None:
+            self.file = open(path, 'w', newline='', encoding='utf-8')
+        else:
+            self.file = open(path, 'r+', newline='', encoding='utf-8')
+            self.file.truncate(offset)
+            self.file.seek(offset)
+        self.start(new=offset is None)
+
+    def start(self, new):
+        pass
+
+    def write(self, city, forecast):
+        self.write_rows(city, forecast)
+        self.file.flush()
+        return [(city.id, self.file.tell())]
+
+    def close(self):
+        self.file.close()
+        return []
+
+
+class CSVSink(TextSink):
+    def start(self, new):
+        self.writer = csv.writer(self.file)
+        if new:
+            self.writer.writerow(LOCATION_COLUMNS + ['time'] + self.variables)
+
+    def write_rows(self, city, forecast):
+        columns = [nullable(forecast[name]) for name in self.variables]
+        self.writer.writerows(
+            [*city, time_label, *values] for time_label, *values in zip(iso_times(forecast), *columns)
+        )
+
+
+class NDJSONSink(TextSink):
+    def write_rows(self, city, forecast):
+        location = dict(zip(LOCATION_COLUMNS, city))
+        columns = [nullable(forecast[name]) for name in self.variables]
+        for time_label, *values in zip(iso_times(forecast), *columns):
+            row = dict(location, time=str(time_label))
+            row.update(zip(self.variables, values))
+            self.file.write(json.dumps(row) + '\n')
+
+
+class ParquetSink:
+    # Output is a directory of part files. Locations are buffered into row groups; a part file
+    # is reported complete only after its footer is written, since unclosed files are unreadable
+    def __init__(self, path, variables, offset=None):
+        import pyarrow as pa
+        self.pa = pa
+        self.path = path
+        self.variables = list(variables)
+        self.schema = pa.schema(
+            [('location_id', pa.string()), ('name', pa.string()), ('country', pa.string()),
+             ('latitude', pa.float64()), ('longitude', pa.float64()), ('time', pa.timestamp('s', tz='UTC'))]
+            + [(name, pa.float32()) for name in self.variables]
+        )
+        os.makedirs(path, exist_ok=True)
+        self.part = sum(1 for name in os.listdir(path) if name.endswith('.parquet'))
+        self.writer = None
+        self.buffer = []
+        self.pending = []
+
+    def write(self, city, forecast):
+        self.buffer.append((city, forecast))
+        if len(self.buffer) >= ROW_GROUP_LOCATIONS:
+            self.flush_row_group()
+        if len(self.pending) >= FILE_LOCATIONS:
+            return self.close_file()
+        return []
+
+    def flush_row_group(self):
+        if not self.buffer:
+            return
+        import pyarrow.parquet as pq
+        pa = self.pa
+        counts = [len(forecast) for _, forecast in self.buffer]
+
+        def repeated(values):
+            # One value per location, repeated for each of its hourly rows
+            return np.repeat(np.array(values, dtype=object), counts)
+
+        columns = {
+            'location_id': repeated([str(city.id) for city, _ in self.buffer]),
+            'name': repeated([city.name for city, _ in self.buffer]),
+            'country': repeated([city.country for city, _ in self.buffer]),
+            'latitude': np.repeat([city.latitude for city, _ in self.buffer], counts),
+            'longitude': np.repeat([city.longitude for city, _ in self.buffer], counts),
+            'time': np.concatenate([forecast.timestamps() for _, forecast in self.buffer]),
+        }
+        for name in self.variables:
+            columns[name] = np.concatenate(
+                [np.asarray(forecast[name], dtype=np.float32) for _, forecast in self.buffer]
+            )
+        table = pa.table(
+            {name: pa.array(columns[name], type=self.schema.field(name).type) for name in self.schema.names}
+        )
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.part_path(self.part), self.schema)
+        self.writer.write_table(table)
+        self.pending.extend(city.id for city, _ in self.buffer)
+        self.buffer = []
+
+    def part_path(self, part):
+        return os.path.join(self.path, f"part-{part:05d}.parquet")
+
+    def close_file(self):
+        self.flush_row_group()
+        if self.writer is None:
+            return []
+        self.writer.close()
+        done = [(location_id, os.path.basename(self.part_path(self.part))) for location_id in self.pending]
+        self.writer = None
+        self.pending = []
+        self.part += 1
+        return done
+
+    def close(self):
+        return self.close_file()
+
+
+SINKS = {'csv': CSVSink, 'ndjson': NDJSONSink, 'parquet': ParquetSink}
+
+
+# --------------------------
+# Resume Progress
+# --------------------------
+def progress_path(output):
+    return f"{output.rstrip(os.sep)}.progress"
+
+
+def load_progress(output, fmt):
+    # Returns (completed location ids, text offset to resume from or None)
+    done = set()
+    offset = None
+    parts = set()
+    path = progress_path(output)
+    lines = []
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            lines = f.read().split('\n')
+        # A crash can leave the last line cut off; drop it before new lines are appended
+        if lines[-1]:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.writelines(f"{line}\n" for line in lines[:-1])
+    for line in lines[:-1]:
+        location_id, marker = line.split('\t')
+        done.add(location_id)
+        if fmt == 'parquet':
+            parts.add(marker)
+        else:
+            offset = int(marker)
+    if fmt == 'parquet' and os.path.isdir(output):
+        # Part files never closed by the previous run hold no recorded locations
+        for name in os.listdir(output):
+            if name.endswith('.parquet') and name not in parts:
+                os.remove(os.path.join(output, name))
+    return done, offset
+
+
+# --------------------------
+# Streaming Export
+# --------------------------
+def export_forecasts(locations, output, fmt='csv', variables=None, forecast_days=None, forecast_hours=None,
+                     workers=EXPORT_WORKERS, resume=False):
+    # Keeps at most 2 x workers locations in flight, and writes each as soon as it arrives
+    projection = make_projection(variables, forecast_days, forecast_hours)
+    done, offset = load_progress(output, fmt) if resume else (set(), None)
+    if not resume:
+        if os.path.exists(progress_path(output)):
+            os.remove(progress_path(output))
+        if fmt == 'parquet' and os.path.isdir(output):
+            for name in os.listdir(output):
+                if name.endswith('.parquet'):
+                    os.remove(os.path.join(output, name))
+    if fmt != 'parquet' and offset is not None and not os.path.exists(output):
+        # Progress without the file it describes cannot be resumed; start over
+        done, offset = set(), None
+        os.remove(progress_path(output))
+    sink = SINKS[fmt](output, projection.variables, offset=offset)
+    progress = open(progress_path(output), 'a', encoding='utf-8')
+
+    def record(entries):
+        for location_id, marker in entries:
+            progress.write(f"{location_id}\t{marker}\n")
+        progress.flush()
+
+    stats = {'exported': 0, 'skipped': 0, 'failed': 0}
+
+    def fetch(city):
+        # Exported forecasts are not cached: one pass over many locations would only evict others
+        return city, fetch_forecast_uncached(city.latitude, city.longitude, variables=projection.variables,
+                                             forecast_days=forecast_days, forecast_hours=forecast_hours)
+
+    def drain(futures):
+        # Writes whatever has finished; rows are only ever buffered one location (or one Parquet
+        # row group) at a time
+        finished, remaining = wait(futures, return_when=FIRST_COMPLETED)
+        for future in finished:
+            city, forecast = future.result()
+            if forecast is None:
+                stats['failed'] += 1
+                logger.warning("No forecast for %s (%s, %s)", city.id, city.latitude, city.longitude)
+                continue
+            record(sink.write(city, forecast))
+            stats['exported'] += 1
+        return set(remaining)
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='weather-export') as executor:
+            in_flight = set()
+            for city in locations:
+                if str(city.id) in done:
+                    stats['skipped'] += 1
+                    continue
+                in_flight.add(executor.submit(fetch, city))
+                if len(in_flight) >= 2 * workers:
+                    in_flight = drain(in_flight)
+            while in_flight:
+                in_flight = drain(in_flight)
+        record(sink.close())
+    finally:
+        progress.close()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stream forecasts for many locations to CSV, NDJSON or Parquet')
+    parser.add_argument('--output', required=True, help='output file (csv, ndjson) or directory (parquet)')
+    parser.add_argument('--format', choices=FORMATS, default='csv')
+    parser.add_argument('--locations', help='CSV with latitude/longitude (and id, name, country); '
+                                            'default: every city in the catalog')
+    parser.add_argument('--variables', help='comma-separated hourly variables; default: all')
+    parser.add_argument('--forecast-days', type=int)
+    parser.add_argument('--forecast-hours', type=int)
+    parser.add_argument('--workers', type=int, default=EXPORT_WORKERS)
+    parser.add_argument('--resume', action='store_true',
+                        help='continue a partial export, skipping finished locations')
+    args = parser.parse_args()
+
+    configure_logging()
+    if args.workers > POOL_SIZE:
+        configure_client(pool_size=args.workers)
+    locations = read_locations(args.locations) if args.locations else iter(CityCatalog())
+    stats = export_forecasts(
+        locations, args.output, fmt=args.format,
+        variables=args.variables.split(',') if args.variables else None,
+        forecast_days=args.forecast_days, forecast_hours=args.forecast_hours,
+        workers=max(1, args.workers), resume=args.resume
+    )
+    print(f"Exported {stats['exported']} locations, skipped {stats['skipped']} already done, "
+          f"{stats['failed']} failed")
+    if stats['failed']:
+        print("Re-run with --resume to retry the failed locations")
+    sys.exit(1 if stats['failed'] else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+import csv
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import unicodedata
+from collections import namedtuple
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+# --------------------------
+# Catalog Configuration
+# --------------------------
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+CATALOG_CSV = os.environ.get('WEATHER_CITY_CSV', os.path.join(DATA_DIR, 'cities.csv'))
+CATALOG_DB = os.environ.get('WEATHER_CITY_CATALOG', os.path.join(DATA_DIR, 'cities.sqlite'))
+# Whether opening the catalog may build a missing or outdated index. Deployments that build it
+# beforehand (`python city_catalog.py`, the gunicorn master) set 0 so importing the app never
+# writes next to the code
+BUILD_ON_OPEN = os.environ.get('WEATHER_CITY_CATALOG_BUILD', '1') != '0'
+SEARCH_LIMIT = 20
+
+City = namedtuple('City', ['id', 'name', 'country', 'latitude', 'longitude'])
+
+_COLUMNS = 'id, name, country, latitude, longitude'
+
+
+def normalize(text):
+    # Case- and accent-insensitive form used for every index lookup
+    decomposed = unicodedata.normalize('NFKD', text)
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return ' '.join(stripped.lower().split())
+
+
+def trigrams(text):
+    padded = f"  {normalize(text)} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def city_label(city):
+    return f"{city.name} ({city.country})"
+
+
+# --------------------------
+# Building the SQLite Catalog
+# --------------------------
+def build_catalog(csv_path=CATALOG_CSV, db_path=CATALOG_DB):
+    # Written to a temporary file of its own and swapped in, so readers never see a half-built
+    # catalog and processes building at the same time never write into each other's file
+    directory = os.path.dirname(os.path.abspath(db_path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(db_path)}.", suffix='.tmp')
+    os.close(fd)
+    try:
+        count = _write_catalog(csv_path, tmp_path)
+        # mkstemp creates the file owner-only; the catalog is read by every worker
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, db_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    logger.info("Built city catalog with %d cities at %s", count, db_path)
+    return count
+
+
+def _write_catalog(csv_path, path):
+    connection = sqlite3.connect(path)
+    try:
+        connection.executescript('''
+            CREATE TABLE cities (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                country TEXT NOT NULL,
+                latitude REAL NOT NULL,
+                longitude REAL NOT NULL,
+                name_norm TEXT NOT NULL
+            );
+            CREATE TABLE trigrams (
+                trigram TEXT NOT NULL,
+                city_id INTEGER NOT NULL,
+                PRIMARY KEY (trigram, city_id)
+            ) WITHOUT ROWID;
+        ''')
+        with open(csv_path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                city_id = int(row['id'])
+                connection.execute(
+                    'INSERT INTO cities VALUES (?, ?, ?, ?, ?, ?)',
+                    (city_id, row['name'], row['country'], float(row['latitude']),
+                     float(row['longitude']), normalize(row['name']))
+                )
+                connection.executemany(
+                    'INSERT INTO trigrams VALUES (?, ?)',
+                    ((gram, city_id) for gram in trigrams(row['name']))
+                )
+        connection.execute('CREATE INDEX ix_cities_name_norm ON cities (name_norm)')
+        connection.commit()
+        return connection.execute('SELECT COUNT(*) FROM cities').fetchone()[0]
+    finally:
+        connection.close()
+
+
+def _needs_build(csv_path, db_path):
+    if not os.path.exists(db_path):
+        return True
+    return os.path.exists(csv_path) and os.path.getmtime(csv_path) > os.path.getmtime(db_path)
+
+
+def ensure_catalog(csv_path=CATALOG_CSV, db_path=CATALOG_DB):
+    # Builds the catalog only when it is missing or older than the CSV; True when it built
+    if not _needs_build(csv_path, db_path):
+        return False
+    build_catalog(csv_path, db_path)
+    return True
+
+
+# --------------------------
+# Catalog Lookups and Search
+# --------------------------
+class CityCatalog:
+    def __init__(self, db_path=CATALOG_DB, csv_path=CATALOG_CSV, build=BUILD_ON_OPEN):
+        self.db_path = db_path
+        if build:
+            ensure_catalog(csv_path, db_path)
+        elif not os.path.exists(db_path):
+            raise FileNotFoundError(f"City catalog {db_path} is missing; build it with `python city_catalog.py`")
+        self._local = threading.local()
+        self.get = lru_cache(maxsize=4096)(self._get)
+
+    def _connection(self):
+        # One read-only connection per thread; SQLite pages are shared through the OS cache
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+            self._local.connection = connection
+        return connection
+
+    def _get(self, city_id):
+        try:
+            city_id = int(city_id)
+        except (TypeError, ValueError):
+            return None
+        row = self._connection().execute(f'SELECT {_COLUMNS} FROM cities WHERE id = ?', (city_id,)).fetchone()
+        return City(*row) if row else None
+
+    def find(self, name, country=None):
+        query = f'SELECT {_COLUMNS} FROM cities WHERE name_norm = ?'
+        params = [normalize(name)]
+        if country is not None:
+            query += ' AND country = ?'
+            params.append(country)
+        row = self._connection().execute(query + ' ORDER BY id LIMIT 1', params).fetchone()
+        return City(*row) if row else None
+
+    def search(self, text, limit=SEARCH_LIMIT):
+        # Name-prefix matches first (index range scan), then fuzzy/infix matches by shared trigrams
+        prefix = normalize(text)
+        if not prefix:
+            return []
+        connection = self._connection()
+        rows = connection.execute(
+            f'SELECT {_COLUMNS} FROM cities WHERE name_norm >= ? AND name_norm < ? '
+            'ORDER BY name_norm, id LIMIT ?',
+            (prefix, prefix + '\U0010ffff', limit)
+        ).fetchall()
+        matches = [City(*row) for row in rows]
+
+        grams = trigrams(prefix)
+        if len(matches) < limit and len(prefix) >= 3:
+            seen = {city.id for city in matches}
+            placeholders = ','.join('?' * len(grams))
+            scored = connection.execute(
+                f'SELECT city_id, COUNT(*) AS score FROM trigrams WHERE trigram IN ({placeholders}) '
+                'GROUP BY city_id HAVING score >= ? ORDER BY score DESC, city_id LIMIT ?',
+                (*grams, max(1, len(grams) // 2), limit + len(seen))
+            ).fetchall()
+            for city_id, _ in scored:
+                if city_id not in seen:
+                    matches.append(self.get(city_id))
+                    if len(matches) >= limit:
+                        break
+        return matches
+
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM cities').fetchone()[0]
+
+    def __iter__(self):
+        # Streams rows so callers can walk very large catalogs without loading them all
+        for row in self._connection().execute(f'SELECT {_COLUMNS} FROM cities ORDER BY id'):
+            yield City(*row)
+
+    def coordinates(self):
+        for city in self:
+            yield (city.latitude, city.longitude)
+
+
+if __name__ == '__main__':
+    print(f"Built catalog with {build_catalog()} cities")
@@ -0,0 +1,118 @@
+import json
+import struct
+import time
+import numpy as np
+
+# --------------------------
+# Compact Forecast Container
+# --------------------------
+class Forecast:
+    # Hourly variables stay as the numpy views returned by the flatbuffer response, and time is
+    # kept as (start, interval, count) instead of a materialized date_range. Views of a batch
+    # response are copied out: they would pin the whole multi-location body and nbytes would
+    # only count this location's share of it
+    __slots__ = ('start', 'interval', 'count', 'variables', 'latitude', 'longitude', 'fetched_at')
+
+    def __init__(self, start, interval, count, variables, latitude=None, longitude=None, fetched_at=None):
+        self.start = int(start)
+        self.interval = int(interval)
+        self.count = int(count)
+        self.variables = variables
+        self.latitude = latitude
+        self.longitude = longitude
+        self.fetched_at = time.time() if fetched_at is None else fetched_at
+
+    @classmethod
+    def from_response(cls, response, variable_names, fetched_at=None, copy=False):
+        # fetched_at is when upstream produced the response; decode time only as a fallback
+        hourly = response.Hourly()
+        start = hourly.Time()
+        interval = hourly.Interval()
+        variables = {}
+        for i, name in enumerate(variable_names):
+            values = hourly.Variables(i).ValuesAsNumpy()
+            variables[name] = np.array(values) if copy else values
+        return cls(
+            start, interval, (hourly.TimeEnd() - start) // interval, variables,
+            latitude=response.Latitude(), longitude=response.Longitude(), fetched_at=fetched_at
+        )
+
+    def to_bytes(self):
+        # Compact form for caches shared between processes: length-prefixed JSON header, then
+        # each variable as little-endian float32
+        header = json.dumps({
+            'start': self.start,
+            'interval': self.interval,
+            'count': self.count,
+            'latitude': None if self.latitude is None else float(self.latitude),
+            'longitude': None if self.longitude is None else float(self.longitude),
+            'fetched_at': self.fetched_at,
+            'variables': [[name, len(values)] for name, values in self.variables.items()],
+        }).encode()
+        parts = [struct.pack('<I', len(header)), header]
+        parts.extend(np.asarray(values, dtype='<f4').tobytes() for values in self.variables.values())
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        # Variables are read-only views into `data`, mirroring the flatbuffer-backed arrays
+        (length,) = struct.unpack_from('<I', data)
+        header = json.loads(data[4:4 + length])
+        offset = 4 + length
+        variables = {}
+        for name, size in header['variables']:
+            variables[name] = np.frombuffer(data, dtype='<f4', count=size, offset=offset)
+            offset += size * 4
+        return cls(
+            header['start'], header['interval'], header['count'], variables,
+            latitude=header['latitude'], longitude=header['longitude'], fetched_at=header['fetched_at']
+        )
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, name):
+        return self.variables[name]
+
+    def __contains__(self, name):
+        return name in self.variables
+
+    @property
+    def columns(self):
+        return list(self.variables)
+
+    @property
+    def version(self):
+        # Keyed on the upstream response time, so decoding the same response again (HTTP cache,
+        # shared cache, store) keeps the version and the renders built from it
+        return (self.start, self.fetched_at)
+
+    def age(self, now=None):
+        return (time.time() if now is None else now) - self.fetched_at
+
+    @property
+    def nbytes(self):
+        return sum(values.nbytes for values in self.variables.values())
+
+    def timestamps(self, count=None):
+        # Unix seconds for the first `count` steps, built on demand
+        count = self.count if count is None else min(count, self.count)
+        return self.start + self.interval * np.arange(count, dtype=np.int64)
+
+    def dates(self, count=None):
+        # pandas is imported on first use; the fetch and cache paths never need it
+        import pandas as pd
+        count = self.count if count is None else min(count, self.count)
+        return pd.date_range(
+            start=pd.to_datetime(self.start, unit="s", utc=True),
+            periods=count,
+            freq=pd.Timedelta(seconds=self.interval)
+        )
+
+    def to_dataframe(self, count=None):
+        import pandas as pd
+        count = self.count if count is None else min(count, self.count)
+        data = {"date": self.dates(count)}
+        for name, values in self.variables.items():
+            data[name] = values[:count]
+        return pd.DataFrame(data=data)
@@ -0,0 +1,203 @@
+import time
+import warnings
+import numpy as np
+from weather_fetcher import fetch_forecast_batch
+
+# --------------------------
+# Analytics Configuration
+# --------------------------
+ANALYTICS_VARIABLES = [
+    'temperature_2m', 'dew_point_2m', 'precipitation_probability', 'cloud_cover', 'weather_code'
+]
+DAY = 86400
+
+# WMO weather interpretation codes grouped into summary categories, ordered by severity
+WEATHER_CATEGORIES = ['clear', 'cloudy', 'fog', 'drizzle', 'rain', 'snow', 'thunderstorm']
+_CATEGORY_CODES = {
+    'clear': (0, 1),
+    'cloudy': (2, 3),
+    'fog': (45, 48),
+    'drizzle': (51, 53, 55, 56, 57),
+    'rain': (61, 63, 65, 66, 67, 80, 81, 82),
+    'snow': (71, 73, 75, 77, 85, 86),
+    'thunderstorm': (95, 96, 99),
+}
+# Lookup table from code to category index; unknown codes map to -1
+_CODE_CATEGORY = np.full(256, -1, dtype=np.int8)
+for _index, _name in enumerate(WEATHER_CATEGORIES):
+    _CODE_CATEGORY[list(_CATEGORY_CODES[_name])] = _index
+
+
+def _quiet(reduce, values, axis):
+    # All-NaN rows (missing cities, hours past a shorter horizon) reduce to NaN without warnings,
+    # and so does an empty axis (a grid or window with no hours)
+    if values.shape[axis] == 0:
+        return np.full(values.shape[:axis] + values.shape[axis + 1:], np.nan, dtype=np.float32)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return reduce(values, axis=axis)
+
+
+# --------------------------
+# City x Hour x Variable Array
+# --------------------------
+class ForecastGrid:
+    # values[city, hour, variable] as float32 on one shared hourly time axis; hours a city's
+    # forecast does not cover, and cities that failed to fetch, are NaN
+    __slots__ = ('locations', 'variables', 'start', 'interval', 'values')
+
+    def __init__(self, locations, variables, start, interval, values):
+        self.locations = locations
+        self.variables = tuple(variables)
+        self.start = int(start)
+        self.interval = int(interval)
+        self.values = values
+
+    @classmethod
+    def from_forecasts(cls, forecasts, variables=ANALYTICS_VARIABLES):
+        # forecasts: {location: Forecast or None}, e.g. the result of fetch_forecast_batch
+        locations = list(forecasts)
+        present = [forecast for forecast in forecasts.values() if forecast is not None]
+        if not present:
+            empty = np.full((len(locations), 0, len(variables)), np.nan, dtype=np.float32)
+            return cls(locations, variables, 0, 3600, empty)
+        interval = present[0].interval
+        start = min(forecast.start for forecast in present)
+        end = max(forecast.start + forecast.interval * forecast.count for forecast in present)
+        values = np.full((len(locations), (end - start) // interval, len(variables)), np.nan, dtype=np.float32)
+        for row, forecast in enumerate(forecasts.values()):
+            if forecast is None or forecast.interval != interval:
+                continue
+            offset = (forecast.start - start) // interval
+            for column, name in enumerate(variables):
+                if name in forecast:
+                    values[row, offset:offset + forecast.count, column] = forecast[name]
+        return cls(locations, variables, start, interval, values)
+
+    def __len__(self):
+        return len(self.locations)
+
+    @property
+    def hours(self):
+        return self.values.shape[1]
+
+    def timestamps(self):
+        return self.start + self.interval * np.arange(self.hours, dtype=np.int64)
+
+    def variable(self, name):
+        # (city, hour) view of one variable
+        return self.values[:, :, self.variables.index(name)]
+
+    def window(self, hours=24, start=None):
+        # Sub-grid covering `hours` steps from `start` (default: the current hour)
+        start = time.time() if start is None else start
+        first = max(0, int((start - self.start) // self.interval))
+        last = min(self.hours, first + max(0, int(hours * 3600 // self.interval)))
+        return ForecastGrid(self.locations, self.variables, self.start + first * self.interval,
+                            self.interval, self.values[:, first:last])
+
+
+def fetch_forecast_grid(coords, variables=ANALYTICS_VARIABLES, forecast_days=None, forecast_hours=None):
+    forecasts = fetch_forecast_batch(coords, variables=variables, forecast_days=forecast_days,
+                                     forecast_hours=forecast_hours)
+    return ForecastGrid.from_forecasts(forecasts, variables)
+
+
+# --------------------------
+# Derived Metrics
+# --------------------------
+def temperature(grid):
+    # Air temperature at 2 m (°C); the dashboard's dew point is a different quantity
+    return grid.variable('temperature_2m')
+
+
+def dew_point_spread(grid):
+    # Small spreads mean near-saturated air (fog, low cloud)
+    return grid.variable('temperature_2m') - grid.variable('dew_point_2m')
+
+
+def daily_stats(grid, name='temperature_2m'):
+    # {'days', 'min', 'max', 'mean'}; each statistic is (city, day) over UTC calendar days
+    values = grid.variable(name)
+    per_day = DAY // grid.interval
+    lead = (grid.start % DAY) // grid.interval
+    total = -(-(lead + grid.hours) // per_day) * per_day
+    padded = np.full((len(grid), total), np.nan, dtype=np.float32)
+    padded[:, lead:lead + grid.hours] = values
+    days = padded.reshape(len(grid), total // per_day, per_day)
+    return {
+        'days': (grid.start // DAY) * DAY + DAY * np.arange(total // per_day, dtype=np.int64),
+        'min': _quiet(np.nanmin, days, 2),
+        'max': _quiet(np.nanmax, days, 2),
+        'mean': _quiet(np.nanmean, days, 2),
+    }
+
+
+def precipitation_windows(grid, threshold=50):
+    # Per city: hours at or above `threshold` percent, the longest such run, and when it starts
+    wet = grid.variable('precipitation_probability') >= threshold
+    counts = np.cumsum(wet, axis=1)
+    # Run length at each hour: wet hours so far minus wet hours before the last dry hour
+    last_dry = np.maximum.accumulate(np.where(wet, 0, counts), axis=1)
+    runs = counts - last_dry
+    longest = runs.max(axis=1) if grid.hours else np.zeros(len(grid), dtype=np.int64)
+    ends = runs.argmax(axis=1) if grid.hours else np.zeros(len(grid), dtype=np.int64)
+    starts = np.where(longest > 0, grid.start + grid.interval * (ends - longest + 1), -1)
+    return {
+        'wet_hours': wet.sum(axis=1),
+        'longest_run': longest,
+        'longest_run_start': starts,
+    }
+
+
+def expected_wet_hours(grid):
+    # Sum of hourly probabilities: the expected number of hours with precipitation
+    probability = grid.variable('precipitation_probability')
+    expected = np.nansum(probability, axis=1) / 100
+    return np.where(np.isnan(probability).all(axis=1), np.nan, expected)
+
+
+def weather_code_summary(grid):
+    # {'counts': (city, category) hours per WEATHER_CATEGORIES entry, 'dominant' and 'worst'
+    # category index per city (-1 when no hour has a known code)}
+    codes = grid.variable('weather_code')
+    known = ~np.isnan(codes)
+    lookup = np.clip(np.where(known, codes, 255), 0, 255).astype(np.uint8)
+    categories = np.where(known, _CODE_CATEGORY[lookup], -1)
+    counts = (categories[:, :, None] == np.arange(len(WEATHER_CATEGORIES))).sum(axis=1)
+    any_known = counts.sum(axis=1) > 0
+    return {
+        'counts': counts,
+        'dominant': np.where(any_known, counts.argmax(axis=1), -1),
+        # initial keeps the reduction defined on a grid with no hours
+        'worst': np.where(any_known, categories.max(axis=1, initial=-1), -1),
+    }
+
+
+# --------------------------
+# Ranking
+# --------------------------
+def rank(grid, scores, n=20, descending=True):
+    # [(location, score)] for the top n cities; cities without a score are left out
+    scores = np.asarray(scores, dtype=np.float64)
+    valid = np.flatnonzero(~np.isnan(scores))
+    n = min(n, len(valid))
+    if n == 0:
+        return []
+    keyed = -scores[valid] if descending else scores[valid]
+    top = valid[np.argpartition(keyed, n - 1)[:n]]
+    top = top[np.argsort(-scores[top] if descending else scores[top], kind='stable')]
+    return [(grid.locations[i], float(scores[i])) for i in top]
+
+
+def wettest(grid, hours=24, n=20, start=None):
+    # Cities expected to see the most hours of precipitation over the next `hours`
+    return rank(grid, expected_wet_hours(grid.window(hours, start)), n=n)
+
+
+def warmest(grid, hours=24, n=20, start=None):
+    return rank(grid, _quiet(np.nanmax, temperature(grid.window(hours, start)), 1), n=n)
+
+
+def coldest(grid, hours=24, n=20, start=None):
+    return rank(grid, _quiet(np.nanmin, temperature(grid.window(hours, start)), 1), n=n, descending=False)
@@ -0,0 +1,144 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from metrics import registry
+
+# --------------------------
+# Cache Configuration
+# --------------------------
+CACHE_MAX_BYTES = int(os.environ.get('WEATHER_MEMORY_CACHE_BYTES', 64 * 1024 * 1024))
+CACHE_TTL = float(os.environ.get('WEATHER_MEMORY_CACHE_TTL', 3600))
+# Last good forecast per location, kept past expiry for stale-while-revalidate serving
+STALE_CACHE_MAX_BYTES = int(os.environ.get('WEATHER_STALE_CACHE_BYTES', 64 * 1024 * 1024))
+STALE_IF_ERROR = float(os.environ.get('WEATHER_STALE_IF_ERROR', 3 * 86400))
+# Upstream models publish new runs on a fixed cadence; a new run invalidates older entries.
+# A run only becomes available some time after its nominal start, so boundaries are shifted
+# by that delay and nothing is refetched before new data can exist
+MODEL_RUN_INTERVAL = int(os.environ.get('WEATHER_MODEL_RUN_INTERVAL', 6 * 3600))
+MODEL_RUN_DELAY = int(os.environ.get('WEATHER_MODEL_RUN_DELAY', 2 * 3600))
+COORD_PRECISION = 2
+
+
+def model_run_for(timestamp=None, interval=MODEL_RUN_INTERVAL, delay=MODEL_RUN_DELAY):
+    # Latest run expected to be published by `timestamp`
+    if timestamp is None:
+        timestamp = time.time()
+    return int((timestamp - delay) // interval) * interval
+
+
+def next_refresh_at(timestamp=None, interval=MODEL_RUN_INTERVAL, delay=MODEL_RUN_DELAY):
+    # When the run after the one current at `timestamp` is expected to be available
+    return model_run_for(timestamp, interval, delay) + interval + delay
+
+
+def location_key(latitude, longitude, projection=None):
+    # projection identifies which variables and horizon the entry holds
+    return (round(latitude, COORD_PRECISION), round(longitude, COORD_PRECISION), projection)
+
+
+def forecast_key(latitude, longitude, projection=None, model_run=None):
+    if model_run is None:
+        model_run = model_run_for()
+    return location_key(latitude, longitude, projection) + (model_run,)
+
+
+def forecast_size(forecast):
+    return forecast.nbytes
+
+
+# --------------------------
+# In-Memory LRU Cache
+# --------------------------
+class ForecastCache:
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, ttl=CACHE_TTL, sizeof=forecast_size):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, record=True):
+        # record=False re-checks an entry without counting it as another hit or miss
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if record:
+                    self.misses += 1
+                return None
+            value, size, expires_at = entry
+            if expires_at <= now:
+                self._remove(key)
+                self.expirations += 1
+                if record:
+                    self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            if record:
+                self.hits += 1
+            return value
+
+    def put(self, key, value, ttl=None):
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return False
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, expires_at)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+        return True
+
+    def invalidate(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+
+forecast_cache = ForecastCache()
+stale_cache = ForecastCache(max_bytes=STALE_CACHE_MAX_BYTES, ttl=STALE_IF_ERROR)
+registry.register_cache('memory', forecast_cache.stats)
+registry.register_cache('stale', stale_cache.stats)
+
+
+def store_forecast(latitude, longitude, projection, forecast, ttl=None):
+    # Fresh entry for the current model run plus the location's last known good forecast
+    forecast_cache.put(forecast_key(latitude, longitude, projection), forecast, ttl=ttl)
+    stale_cache.put(location_key(latitude, longitude, projection), forecast)
@@ -0,0 +1,246 @@
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+import numpy as np
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from forecast import Forecast
+
+logger = logging.getLogger(__name__)
+
+# --------------------------
+# Store Configuration
+# --------------------------
+DAY = 86400
+
+
+def location_partition(latitude, longitude):
+    return f"{latitude:.2f}_{longitude:.2f}"
+
+
+def projection_id(projection):
+    return f"{','.join(projection.variables)}|{projection.forecast_days}|{projection.forecast_hours}"
+
+
+# --------------------------
+# Persistent Forecast Store
+# --------------------------
+class ForecastStore:
+    # Parquet files partitioned as location=<lat>_<lon>/date=<YYYY-MM-DD>/run-<model run>.parquet.
+    # Each run only writes the hours whose values changed since the previous run; a small SQLite
+    # manifest records the latest run per location and projection so restarts can skip re-fetching.
+    def __init__(self, root, variables):
+        self.root = root
+        self.variables = list(variables)
+        self.schema = pa.schema(
+            [('time', pa.timestamp('s', tz='UTC')), ('model_run', pa.int64()), ('fetched_at', pa.float64())]
+            + [(name, pa.float32()) for name in self.variables]
+        )
+        os.makedirs(root, exist_ok=True)
+        # Leading underscore keeps the manifest out of the Parquet dataset scan
+        self._manifest_path = os.path.join(root, '_manifest.sqlite')
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        with self._manifest() as connection:
+            connection.execute('''
+                CREATE TABLE IF NOT EXISTS runs (
+                    location TEXT NOT NULL,
+                    projection TEXT NOT NULL,
+                    model_run INTEGER NOT NULL,
+                    start INTEGER NOT NULL,
+                    interval INTEGER NOT NULL,
+                    count INTEGER NOT NULL,
+                    latitude REAL,
+                    longitude REAL,
+                    fetched_at REAL NOT NULL,
+                    PRIMARY KEY (location, projection)
+                )
+            ''')
+            connection.execute('''
+                CREATE TABLE IF NOT EXISTS cells (
+                    query_latitude REAL NOT NULL,
+                    query_longitude REAL NOT NULL,
+                    latitude REAL NOT NULL,
+                    longitude REAL NOT NULL,
+                    PRIMARY KEY (query_latitude, query_longitude)
+                )
+            ''')
+        self._queue = queue.SimpleQueue()
+        self._writer = None
+        self.rows_written = 0
+        self.rows_skipped = 0
+
+    def _manifest(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self._manifest_path, timeout=30)
+            self._local.connection = connection
+        return connection
+
+    def cells(self):
+        # (query lat, query lon, cell lat, cell lon) pairs learned before the last restart
+        return self._manifest().execute(
+            'SELECT query_latitude, query_longitude, latitude, longitude FROM cells'
+        ).fetchall()
+
+    def latest_run(self, latitude, longitude, projection):
+        row = self._manifest().execute(
+            'SELECT model_run, start, interval, count, latitude, longitude, fetched_at FROM runs '
+            'WHERE location = ? AND projection = ?',
+            (location_partition(latitude, longitude), projection_id(projection))
+        ).fetchone()
+        return row
+
+    # ---- writing ----
+    def append(self, query, latitude, longitude, projection, forecast, model_run):
+        # Queued so request threads never wait on Parquet encoding or disk I/O
+        if self._writer is None or not self._writer.is_alive():
+            with self._write_lock:
+                if self._writer is None or not self._writer.is_alive():
+                    self._writer = threading.Thread(target=self._drain, name='forecast-store', daemon=True)
+                    self._writer.start()
+        self._queue.put((query, latitude, longitude, projection, forecast, model_run))
+
+    def _drain(self):
+        while True:
+            item = self._queue.get()
+            try:
+                self.write(*item)
+            except Exception as e:
+                logger.error(f"Error writing forecast to store: {e}")
+
+    def write(self, query, latitude, longitude, projection, forecast, model_run):
+        location = location_partition(latitude, longitude)
+        previous = self.latest_run(latitude, longitude, projection)
+        # fetched_at is the upstream response time, so a response re-decoded from the HTTP cache
+        # (or an older one arriving late) matches or predates the stored run and is skipped
+        if previous is not None and previous[6] >= forecast.fetched_at:
+            return 0
+
+        times = forecast.timestamps()
+        changed = np.ones(len(times), dtype=bool)
+        if previous is not None:
+            # Compare against what the store already holds for these hours
+            stored = self.read(latitude, longitude, start=int(times[0]), end=int(times[-1]) + 1,
+                               variables=list(projection.variables))
+            if len(stored):
+                stored_times = stored['time'].dt.tz_convert(None).to_numpy().astype('datetime64[s]').astype(np.int64)
+                positions = np.searchsorted(times, stored_times)
+                valid = (positions < len(times)) & (times[np.minimum(positions, len(times) - 1)] == stored_times)
+                same = np.ones(valid.sum(), dtype=bool)
+                for name in projection.variables:
+                    old = stored[name].to_numpy(dtype=np.float32)[valid]
+                    new = forecast[name][positions[valid]]
+                    same &= (old == new) | (np.isnan(old) & np.isnan(new))
+                changed[positions[valid][same]] = False
+
+        written = int(changed.sum())
+        if written:
+            columns = {
+                'time': pa.array(times[changed], type=pa.timestamp('s', tz='UTC')),
+                'model_run': pa.array(np.full(written, model_run, dtype=np.int64)),
+                'fetched_at': pa.array(np.full(written, forecast.fetched_at)),
+            }
+            for name in self.variables:
+                if name in forecast:
+                    columns[name] = pa.array(forecast[name][changed], type=pa.float32())
+                else:
+                    columns[name] = pa.nulls(written, type=pa.float32())
+            table = pa.table(columns, schema=self.schema)
+            days = (times[changed] // DAY) * DAY
+            for day in np.unique(days):
+                date = time.strftime('%Y-%m-%d', time.gmtime(int(day)))
+                directory = os.path.join(self.root, f"location={location}", f"date={date}")
+                os.makedirs(directory, exist_ok=True)
+                pq.write_table(
+                    table.filter(pa.array(days == day)),
+                    os.path.join(directory, f"run-{model_run}-{int(forecast.fetched_at * 1000)}.parquet")
+                )
+
+        with self._manifest() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (location, projection_id(projection), model_run, forecast.start, forecast.interval,
+                 forecast.count, forecast.latitude, forecast.longitude, forecast.fetched_at)
+            )
+            connection.execute(
+                'INSERT OR REPLACE INTO cells VALUES (?, ?, ?, ?)', (*query, latitude, longitude)
+            )
+        self.rows_written += written
+        self.rows_skipped += len(times) - written
+        return written
+
+    # ---- reading ----
+    def _location_dir(self, latitude, longitude):
+        return os.path.join(self.root, f"location={location_partition(latitude, longitude)}")
+
+    def dataset(self, latitude=None, longitude=None):
+        # With a location only that partition's directory is listed; file discovery over the whole
+        # root grows with every location and run, and read() is on the fetch path
+        partitioning = ds.partitioning(
+            pa.schema([('location', pa.string()), ('date', pa.string())]), flavor='hive'
+        )
+        source = self.root if latitude is None else self._location_dir(latitude, longitude)
+        return ds.dataset(source, format='parquet', partitioning=partitioning, partition_base_dir=self.root,
+                          schema=self._dataset_schema())
+
+    def _dataset_schema(self):
+        return self.schema.append(pa.field('location', pa.string())).append(pa.field('date', pa.string()))
+
+    def read(self, latitude=None, longitude=None, start=None, end=None, variables=None, latest_only=True):
+        # A location scopes discovery to its partition; date filters prune the rest before any
+        # Parquet file is opened
+        expression = None
+
+        def both(condition):
+            return condition if expression is None else expression & condition
+
+        located = latitude is not None and longitude is not None
+        if start is not None:
+            expression = both(ds.field('date') >= time.strftime('%Y-%m-%d', time.gmtime(start)))
+            expression = both(ds.field('time') >= pa.scalar(start, type=pa.timestamp('s', tz='UTC')))
+        if end is not None:
+            expression = both(ds.field('date') <= time.strftime('%Y-%m-%d', time.gmtime(end)))
+            expression = both(ds.field('time') < pa.scalar(end, type=pa.timestamp('s', tz='UTC')))
+
+        columns = ['location', 'time', 'model_run'] + list(variables or self.variables)
+        if located:
+            empty = not os.path.isdir(self._location_dir(latitude, longitude))
+        else:
+            empty = not os.path.isdir(self.root) or not any(
+                name.startswith('location=') for name in os.listdir(self.root)
+            )
+        if empty:
+            schema = self._dataset_schema()
+            return pa.table({name: [] for name in columns},
+                            schema=pa.schema([schema.field(name) for name in columns])).to_pandas()
+        dataset = self.dataset(latitude, longitude) if located else self.dataset()
+        table = dataset.to_table(columns=columns, filter=expression)
+        if table.num_rows:
+            table = table.sort_by([('location', 'ascending'), ('time', 'ascending'), ('model_run', 'ascending')])
+        frame = table.to_pandas()
+        if latest_only and len(frame):
+            # Runs only hold changed hours, so the newest non-null value per hour wins
+            frame = frame.groupby(['location', 'time'], as_index=False, sort=True).last()
+        return frame
+
+    def load_forecast(self, latitude, longitude, projection, model_run):
+        # Rebuilds a forecast persisted for this model run, or None when the store is behind
+        manifest = self.latest_run(latitude, longitude, projection)
+        if manifest is None or manifest[0] < model_run:
+            return None
+        stored_run, start, interval, count, cell_latitude, cell_longitude, fetched_at = manifest
+        frame = self.read(latitude, longitude, start=start, end=start + interval * count,
+                          variables=list(projection.variables))
+        if len(frame) != count:
+            return None
+        variables = {name: frame[name].to_numpy(dtype=np.float32) for name in projection.variables}
+        return Forecast(start, interval, count, variables, latitude=cell_latitude, longitude=cell_longitude,
+                        fetched_at=fetched_at)
+
+    def stats(self):
+        return {'rows_written': self.rows_written, 'rows_skipped': self.rows_skipped}
@@ -0,0 +1,89 @@
+import math
+import os
+import threading
+
+# --------------------------
+# Grid Index Configuration
+# --------------------------
+# Spacing of the upstream model grid in degrees; a query inside a known cell's box reuses that cell.
+# Unset, only coordinates upstream has already mapped to a cell are snapped: model grids are finer
+# than 0.1° (about 0.02-0.03° for the regional models), and a guessed spacing merges neighbours
+GRID_RESOLUTION = os.environ.get('WEATHER_GRID_RESOLUTION')
+GRID_RESOLUTION = float(GRID_RESOLUTION) if GRID_RESOLUTION else None
+CELL_PRECISION = 4
+
+
+# --------------------------
+# Model Grid Cell Index
+# --------------------------
+class GridIndex:
+    # Learns which grid cell Open-Meteo answers with (response.Latitude()/Longitude()) and maps
+    # nearby queries onto already-known cells so they share one fetch and one cache entry
+    def __init__(self, resolution=GRID_RESOLUTION):
+        self.resolution = resolution
+        self._lock = threading.Lock()
+        self._aliases = {}
+        self._cells = set()
+        self._buckets = {}
+        self.snapped = 0
+        self.unknown = 0
+
+    def _bucket(self, latitude, longitude):
+        return (math.floor(latitude / self.resolution), math.floor(longitude / self.resolution))
+
+    def _query_key(self, latitude, longitude):
+        return (round(latitude, CELL_PRECISION), round(longitude, CELL_PRECISION))
+
+    def learn(self, latitude, longitude, cell_latitude, cell_longitude):
+        cell = self._query_key(cell_latitude, cell_longitude)
+        with self._lock:
+            self._aliases[self._query_key(latitude, longitude)] = cell
+            self._aliases[cell] = cell
+            self._cells.add(cell)
+            if self.resolution:
+                self._buckets.setdefault(self._bucket(*cell), set()).add(cell)
+        return cell
+
+    def snap(self, latitude, longitude):
+        # Returns the known cell for this query, or None when no cell covers it yet
+        query = self._query_key(latitude, longitude)
+        with self._lock:
+            cell = self._aliases.get(query)
+            if cell is None and self.resolution:
+                half = self.resolution / 2
+                row, col = self._bucket(latitude, longitude)
+                best = None
+                for d_row in (-1, 0, 1):
+                    for d_col in (-1, 0, 1):
+                        for candidate in self._buckets.get((row + d_row, col + d_col), ()):
+                            d_lat = abs(candidate[0] - latitude)
+                            d_lon = abs(candidate[1] - longitude)
+                            if d_lat <= half and d_lon <= half:
+                                distance = d_lat * d_lat + d_lon * d_lon
+                                if best is None or distance < best[0]:
+                                    best = (distance, candidate)
+                if best is not None:
+                    cell = best[1]
+                    self._aliases[query] = cell
+            if cell is None:
+                self.unknown += 1
+            else:
+                self.snapped += 1
+            return cell
+
+    def __len__(self):
+        with self._lock:
+            return len(self._cells)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'cells': len(self._cells),
+                'aliases': len(self._aliases),
+                'snapped': self.snapped,
+                'unknown': self.unknown,
+                'resolution': self.resolution,
+            }
+
+
+grid_index = GridIndex()
@@ -0,0 +1,30 @@
+import multiprocessing
+import os
+
+# --------------------------
+# Gunicorn Configuration
+# --------------------------
+# gunicorn -c gunicorn.conf.py wsgi:server
+bind = os.environ.get('WEATHER_BIND', '0.0.0.0:8050')
+# One process per core; threads cover requests blocked on upstream I/O
+workers = int(os.environ.get('WEATHER_WORKERS', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+threads = int(os.environ.get('WEATHER_THREADS', 4))
+timeout = 60
+keepalive = 5
+# The app is imported in each worker, never in the master, so no client, thread or SQLite
+# connection is shared across a fork
+preload_app = False
+
+# Workers share parsed forecasts through one SQLite file unless a Redis URL is configured,
+# so a city fetched by one worker is not fetched again by the others
+os.environ.setdefault('WEATHER_SHARED_CACHE', os.path.abspath('.shared_cache.sqlite'))
+
+
+def on_starting(server):
+    # The master builds the city catalog once before forking; workers only open it and never
+    # race each other to write it. Set before the import: forked workers inherit the module
+    os.environ['WEATHER_CITY_CATALOG_BUILD'] = '0'
+    from city_catalog import ensure_catalog
+    if ensure_catalog():
+        server.log.info("Built the city catalog")
@@ -0,0 +1,147 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# --------------------------
+# Metrics Configuration
+# --------------------------
+# Seconds; spans from sub-millisecond memory hits up to slow upstream fetches
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{value}"' for name, value in labels.items()) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# --------------------------
+# Histograms
+# --------------------------
+class Histogram:
+    # Cumulative buckets per label value, rendered in Prometheus text exposition format
+    def __init__(self, name, help, label, buckets=STAGE_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, label_value, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {label_value: (list(counts), total, count)
+                      for label_value, (counts, total, count) in self._series.items()}
+        for label_value, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                le = bound if bound == '+Inf' else _number(float(bound))
+                lines.append(f"{self.name}_bucket{_labels(**{self.label: label_value, 'le': le})} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(**{self.label: label_value})} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(**{self.label: label_value})} {count}")
+        return lines
+
+    def stats(self):
+        with self._lock:
+            return {label_value: {'count': count, 'sum': total}
+                    for label_value, (_, total, count) in self._series.items()}
+
+
+# --------------------------
+# Registry and Exposition
+# --------------------------
+class MetricsRegistry:
+    # Histograms are fed by span(); cache and component stats are read at scrape time
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = []
+        self._caches = {}
+        self._stats = {}
+
+    def histogram(self, name, help, label, buckets=STAGE_BUCKETS):
+        histogram = Histogram(name, help, label, buckets)
+        with self._lock:
+            self._histograms.append(histogram)
+        return histogram
+
+    def register_cache(self, name, stats):
+        # stats() returns a dict with at least 'hits' and 'misses'
+        with self._lock:
+            self._caches[name] = stats
+
+    def register_stats(self, prefix, stats):
+        # Every numeric value of stats() becomes a gauge named <prefix>_<key>
+        with self._lock:
+            self._stats[prefix] = stats
+
+    def render(self):
+        with self._lock:
+            histograms = list(self._histograms)
+            caches = dict(self._caches)
+            stats = dict(self._stats)
+        lines = []
+        for histogram in histograms:
+            lines.extend(histogram.render())
+
+        snapshots = {name: collect() for name, collect in sorted(caches.items())}
+        for metric, kind, help, pick in (
+            ('weather_cache_hits_total', 'counter', 'Cache lookups served from the cache', lambda s: s['hits']),
+            ('weather_cache_misses_total', 'counter', 'Cache lookups that missed', lambda s: s['misses']),
+            ('weather_cache_hit_ratio', 'gauge', 'Hits over lookups since start',
+             lambda s: s['hits'] / (s['hits'] + s['misses']) if s['hits'] + s['misses'] else 0.0),
+        ):
+            lines.append(f"# HELP {metric} {help}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for name, snapshot in snapshots.items():
+                lines.append(f"{metric}{_labels(cache=name)} {_number(pick(snapshot))}")
+
+        for prefix, collect in sorted(stats.items()):
+            for key, value in sorted(collect().items()):
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines.append(f"# TYPE {prefix}_{key} gauge")
+                    lines.append(f"{prefix}_{key} {_number(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+stage_seconds = registry.histogram(
+    'weather_stage_seconds', 'Time spent in each stage of the fetch-to-render pipeline', 'stage'
+)
+
+
+@contextmanager
+def span(stage):
+    # Always on: two perf_counter calls and one locked bucket increment per stage
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_seconds.observe(stage, time.perf_counter() - start)
+
+
+def spanned(stage):
+    # Decorator form of span() for whole functions, e.g. Dash callbacks
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
@@ -0,0 +1,177 @@
+import logging
+import os
+import random
+import threading
+import time
+from refresh_schedule import refresh_index
+from weather_fetcher import fetch_forecast, resolve_location
+
+logger = logging.getLogger(__name__)
+
+# --------------------------
+# Pre-warm Configuration
+# --------------------------
+# Locations are refreshed when the refresh index says their next model run is out; the interval
+# only bounds how long the warmer sleeps between checks
+PREWARM_INTERVAL = float(os.environ.get('WEATHER_PREWARM_INTERVAL', 3 * 3600))
+PREWARM_SPREAD = float(os.environ.get('WEATHER_PREWARM_SPREAD', 600))
+PREWARM_CONCURRENCY = int(os.environ.get('WEATHER_PREWARM_CONCURRENCY', 4))
+# A failed refresh is retried after this long instead of waiting for the next model run
+PREWARM_RETRY = float(os.environ.get('WEATHER_PREWARM_RETRY', 600))
+# Leadership lease across worker processes; renewed every third of it, so a dead leader's
+# warmer is taken over within one lease
+PREWARM_LEASE = float(os.environ.get('WEATHER_PREWARM_LEASE', 60))
+
+
+# --------------------------
+# Background Cache Warmer
+# --------------------------
+class CacheWarmer:
+    def __init__(self, locations, interval=PREWARM_INTERVAL, spread=PREWARM_SPREAD,
+                 max_concurrency=PREWARM_CONCURRENCY, fetch=fetch_forecast, leader=None,
+                 index=refresh_index, retry=PREWARM_RETRY, lease=PREWARM_LEASE):
+        self.locations = list(dict.fromkeys(locations))
+        self.interval = interval
+        self.spread = min(spread, interval)
+        self.fetch = fetch
+        # Optional leader(ttl) check so only one of several worker processes refreshes
+        self.leader = leader
+        self.lease = lease
+        self._renewed_at = 0.0
+        self.index = index
+        self.retry = retry
+        self._slots = threading.BoundedSemaphore(max(1, max_concurrency))
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._in_flight = set()
+        self.cycles = 0
+        self.skipped = 0
+        self.refreshed = 0
+        self.failed = 0
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='weather-prewarm', daemon=True)
+        self._thread.start()
+        logger.info(f"Started cache warmer for {len(self.locations)} locations every {self.interval}s")
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'locations': len(self.locations),
+                'in_flight': len(self._in_flight),
+                'cycles': self.cycles,
+                'skipped': self.skipped,
+                'refreshed': self.refreshed,
+                'failed': self.failed,
+            }
+
+    def _run(self):
+        # One full pass (served from the HTTP cache where it is still fresh), then only locations
+        # whose next model run is due, as soon as the refresh index says so
+        leading = self._lead()
+        if leading:
+            self.run_cycle()
+        while not self._stop.is_set():
+            next_due = self.index.next_due()
+            delay = self.interval if next_due is None else min(self.interval, max(0.0, next_due - time.time()))
+            if self.leader is not None:
+                # Wake often enough to renew the lease, or to take over once its holder is gone
+                delay = min(delay, self.lease / 3)
+            if self._stop.wait(delay):
+                break
+            if not self._lead():
+                leading = False
+                continue
+            if not leading:
+                # Taking over from another worker: this process has not seen its fetches
+                leading = True
+                self.run_cycle()
+                continue
+            due = self.due_locations()
+            if due:
+                self.run_cycle(due, force_refresh=True)
+
+    def _lead(self):
+        # A short lease, renewed at every wake-up and during long cycles
+        if self.leader is None or self.leader(self.lease):
+            self._renewed_at = time.monotonic()
+            return True
+        with self._lock:
+            self.skipped += 1
+        return False
+
+    def _pause(self, delay):
+        # Sleeps between submissions, renewing leadership when a third of the lease has passed;
+        # False once stopped or when another worker has taken over
+        end = time.monotonic() + delay
+        while not self._stop.is_set():
+            if self.leader is not None and time.monotonic() - self._renewed_at >= self.lease / 3:
+                if not self._lead():
+                    return False
+            left = end - time.monotonic()
+            if left <= 0:
+                return True
+            wait = left if self.leader is None else min(left, self.lease / 3)
+            self._stop.wait(wait)
+        return False
+
+    def due_locations(self, now=None):
+        # Due entries in the shared index, limited to the locations this warmer covers
+        due = set(self.index.pop_due(now))
+        targets = dict.fromkeys(resolve_location(*location) for location in self.locations)
+        return [location for location in targets if location in due]
+
+    def run_cycle(self, locations=None, force_refresh=False):
+        # Spread submissions evenly across the window, with jitter so workers do not sync up
+        # Cities that share a known model grid cell are refreshed once per cycle
+        if locations is None:
+            locations = self.locations
+        locations = list(dict.fromkeys(resolve_location(*location) for location in locations))
+        random.shuffle(locations)
+        gap = self.spread / len(locations) if locations else 0
+        workers = []
+        for position, (latitude, longitude) in enumerate(locations):
+            if not self._pause(gap * random.uniform(0.5, 1.5) if position else 0):
+                break
+            self._slots.acquire()
+            worker = threading.Thread(
+                target=self._refresh, args=(latitude, longitude, force_refresh), daemon=True
+            )
+            worker.start()
+            workers.append(worker)
+        for worker in workers:
+            worker.join()
+        with self._lock:
+            self.cycles += 1
+
+    def _refresh(self, latitude, longitude, force_refresh=False):
+        # force_refresh goes to upstream; a successful fetch reschedules the location
+        with self._lock:
+            self._in_flight.add((latitude, longitude))
+        forecast = None
+        try:
+            forecast = self.fetch(latitude, longitude, force_refresh=force_refresh)
+            with self._lock:
+                if forecast is None:
+                    self.failed += 1
+                else:
+                    self.refreshed += 1
+        except Exception as e:
+            logger.error(f"Error pre-warming {latitude}, {longitude}: {e}")
+            with self._lock:
+                self.failed += 1
+        finally:
+            if forecast is None:
+                self.index.schedule(resolve_location(latitude, longitude), time.time() + self.retry)
+            with self._lock:
+                self._in_flight.discard((latitude, longitude))
+            self._slots.release()
@@ -0,0 +1,99 @@
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+# --------------------------
+# Profiler Configuration
+# --------------------------
+# Opt-in: WEATHER_PROFILE=1 samples every request thread and writes one profile per request
+PROFILE_ENABLED = os.environ.get('WEATHER_PROFILE', '0') == '1'
+PROFILE_DIR = os.environ.get('WEATHER_PROFILE_DIR', 'profiles')
+PROFILE_INTERVAL = float(os.environ.get('WEATHER_PROFILE_INTERVAL', 0.005))
+# Requests faster than this are not written, so only the slow ones pile up on disk
+PROFILE_MIN_DURATION = float(os.environ.get('WEATHER_PROFILE_MIN_DURATION', 0.0))
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+# --------------------------
+# Sampling Profiler
+# --------------------------
+class _Profile:
+    __slots__ = ('name', 'started', 'samples')
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.samples = Counter()
+
+
+class SamplingProfiler:
+    # One background thread snapshots the stacks of threads currently inside a profiled request
+    # (sys._current_frames) every `interval` seconds. Profiles are written in collapsed-stack
+    # format ("a;b;c count"), which flamegraph.pl and speedscope open directly
+    def __init__(self, directory=PROFILE_DIR, interval=PROFILE_INTERVAL, min_duration=PROFILE_MIN_DURATION):
+        self.directory = directory
+        self.interval = interval
+        self.min_duration = min_duration
+        self._lock = threading.Lock()
+        self._active = {}
+        self._thread = None
+        self.written = 0
+
+    def begin(self, name):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    os.makedirs(self.directory, exist_ok=True)
+                    self._thread = threading.Thread(target=self._sample, name='weather-profiler', daemon=True)
+                    self._thread.start()
+        with self._lock:
+            self._active[threading.get_ident()] = _Profile(name)
+
+    def end(self):
+        with self._lock:
+            profile = self._active.pop(threading.get_ident(), None)
+        if profile is None or not profile.samples:
+            return None
+        duration = time.perf_counter() - profile.started
+        if duration < self.min_duration:
+            return None
+        slug = re.sub(r'[^A-Za-z0-9_.-]+', '_', profile.name).strip('_')[:80]
+        path = os.path.join(
+            self.directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{int(duration * 1000)}ms-{os.getpid()}-{slug}.folded"
+        )
+        with open(path, 'w') as f:
+            for stack, count in profile.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        self.written += 1
+        return path
+
+    def _sample(self):
+        own = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    continue
+                frames = sys._current_frames()
+                for ident, profile in self._active.items():
+                    frame = frames.get(ident)
+                    if frame is None or ident == own:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        stack.append(_frame_label(frame))
+                        frame = frame.f_back
+                    profile.samples[';'.join(reversed(stack))] += 1
+
+
+profiler = SamplingProfiler() if PROFILE_ENABLED else None
@@ -0,0 +1,69 @@
+import heapq
+import threading
+import time
+from forecast_cache import next_refresh_at
+
+# --------------------------
+# Next-Refresh-Due Index
+# --------------------------
+class RefreshIndex:
+    # When each location next needs fetching: right after the model run following the one its
+    # cached forecast came from. A heap keeps the earliest due location at the front
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._due = {}
+        self._heap = []
+        self.scheduled = 0
+        self.popped = 0
+
+    def schedule(self, location, due_at):
+        with self._lock:
+            self._due[location] = due_at
+            heapq.heappush(self._heap, (due_at, location))
+            self.scheduled += 1
+            # Superseded heap entries are skipped lazily; rebuild once they dominate
+            if len(self._heap) > 4 * len(self._due) + 64:
+                self._heap = [(due, location) for location, due in self._due.items()]
+                heapq.heapify(self._heap)
+
+    def record(self, location, fetched_at):
+        self.schedule(location, next_refresh_at(fetched_at))
+
+    def due_at(self, location):
+        with self._lock:
+            return self._due.get(location)
+
+    def next_due(self):
+        with self._lock:
+            while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now=None):
+        # Locations whose refresh is due; each stays known until it is scheduled again
+        now = time.time() if now is None else now
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                due_at, location = heapq.heappop(self._heap)
+                if self._due.get(location) == due_at:
+                    due.append(location)
+            self.popped += len(due)
+        return due
+
+    def __len__(self):
+        with self._lock:
+            return len(self._due)
+
+    def stats(self):
+        next_due = self.next_due()
+        with self._lock:
+            return {
+                'locations': len(self._due),
+                'scheduled': self.scheduled,
+                'popped': self.popped,
+                'next_due_in': max(0.0, next_due - time.time()) if next_due is not None else 0.0,
+            }
+
+
+refresh_index = RefreshIndex()
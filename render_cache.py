@@ -0,0 +1,67 @@
+import os
+import threading
+from collections import OrderedDict
+
+# --------------------------
+# Render Cache Configuration
+# --------------------------
+RENDER_CACHE_ENTRIES = int(os.environ.get('WEATHER_RENDER_CACHE_ENTRIES', 1024))
+
+
+# --------------------------
+# Rendered Output Cache
+# --------------------------
+class RenderCache:
+    # One rendered payload per view key, valid only for the forecast version it was built from
+    def __init__(self, max_entries=RENDER_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] != version:
+                # Newer data arrived since this was rendered
+                del self._entries[key]
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, version, payload):
+        with self._lock:
+            self._entries[key] = (version, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_render(self, key, version, render):
+        payload = self.get(key, version)
+        if payload is None:
+            payload = render()
+            self.put(key, version, payload)
+        return payload
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,255 @@
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from forecast import Forecast
+from forecast_cache import CACHE_TTL
+from metrics import registry, span
+
+logger = logging.getLogger(__name__)
+
+# --------------------------
+# Shared Cache Configuration
+# --------------------------
+# Unset keeps every cache per process. A file path (or file://path) shares parsed forecasts
+# between worker processes on this host through SQLite; redis://host:port/db uses any
+# Redis-compatible server, so workers on several hosts share one cache
+SHARED_CACHE_URL = os.environ.get('WEATHER_SHARED_CACHE')
+# A worker that misses the shared cache takes a lease before fetching; others wait for its result
+LEASE_TTL = float(os.environ.get('WEATHER_SHARED_LEASE_TTL', 30))
+LEASE_WAIT = float(os.environ.get('WEATHER_SHARED_LEASE_WAIT', 10))
+POLL_INTERVAL = 0.05
+PURGE_EVERY = 256
+KEY_PREFIX = 'weather:'
+
+
+def process_id():
+    # Evaluated per call so a forked worker never reuses its parent's identity
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+# --------------------------
+# SQLite Backend
+# --------------------------
+class SQLiteBackend:
+    # One WAL-mode database file; every worker on the host opens it and sees the others' writes
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        with self._connection() as connection:
+            connection.execute('''
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            ''')
+            connection.execute('''
+                CREATE TABLE IF NOT EXISTS leases (
+                    key TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            ''')
+
+    def _connection(self):
+        # Opened lazily per thread, so connections are never inherited across a fork
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def get(self, key):
+        row = self._connection().execute(
+            'SELECT value FROM entries WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return bytes(row[0]) if row else None
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        with self._connection() as connection:
+            connection.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?)', (key, value, now + ttl))
+            self._writes += 1
+            if self._writes % PURGE_EVERY == 0:
+                connection.execute('DELETE FROM entries WHERE expires_at <= ?', (now,))
+                connection.execute('DELETE FROM leases WHERE expires_at <= ?', (now,))
+
+    def acquire(self, key, owner, ttl):
+        # Takes a free or expired lease, or extends one this owner already holds
+        now = time.time()
+        with self._connection() as connection:
+            connection.execute('DELETE FROM leases WHERE key = ? AND expires_at <= ?', (key, now))
+            connection.execute('INSERT OR IGNORE INTO leases VALUES (?, ?, ?)', (key, owner, now + ttl))
+            cursor = connection.execute(
+                'UPDATE leases SET expires_at = ? WHERE key = ? AND owner = ?', (now + ttl, key, owner)
+            )
+            return cursor.rowcount == 1
+
+    def release(self, key, owner):
+        with self._connection() as connection:
+            connection.execute('DELETE FROM leases WHERE key = ? AND owner = ?', (key, owner))
+
+
+# --------------------------
+# Redis Backend
+# --------------------------
+class RedisBackend:
+    # Uses only GET, SET (NX/PX), PEXPIRE and DEL, so any Redis-compatible server works,
+    # including the local stand-in in benchmarks/fake_redis.py
+    def __init__(self, url=None, client=None):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.client = client
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, value, ttl):
+        self.client.set(key, value, px=max(1, int(ttl * 1000)))
+
+    def acquire(self, key, owner, ttl):
+        px = max(1, int(ttl * 1000))
+        if self.client.set(key, owner, nx=True, px=px):
+            return True
+        held_by = self.client.get(key)
+        if held_by is not None and held_by.decode() == owner:
+            self.client.pexpire(key, px)
+            return True
+        return False
+
+    def release(self, key, owner):
+        # Not atomic; at worst a lease that just expired and was re-taken is dropped early
+        held_by = self.client.get(key)
+        if held_by is not None and held_by.decode() == owner:
+            self.client.delete(key)
+
+
+def open_backend(url):
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisBackend(url)
+    path = url[len('file://'):] if url.startswith('file://') else url
+    return SQLiteBackend(path)
+
+
+# --------------------------
+# Cross-Process Forecast Cache
+# --------------------------
+class SharedForecastCache:
+    # Second cache level behind each worker's in-memory LRU. Backend errors are logged and
+    # treated as misses, so an unavailable shared cache only costs extra upstream fetches
+    def __init__(self, backend, ttl=CACHE_TTL, lease_ttl=LEASE_TTL, lease_wait=LEASE_WAIT):
+        self.backend = backend
+        self.ttl = ttl
+        self.lease_ttl = lease_ttl
+        self.lease_wait = lease_wait
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.waits = 0
+        self.errors = 0
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    @staticmethod
+    def encode_key(key):
+        # forecast_key tuples repr() identically in every process
+        return f"{KEY_PREFIX}forecast:{key!r}"
+
+    def get(self, key):
+        try:
+            with span('shared_cache'):
+                data = self.backend.get(self.encode_key(key))
+        except Exception as e:
+            logger.warning(f"Shared cache read failed: {e}")
+            self._count('errors')
+            return None
+        if data is None:
+            self._count('misses')
+            return None
+        self._count('hits')
+        return Forecast.from_bytes(data)
+
+    def put(self, key, forecast, ttl=None):
+        # Expiry follows the forecast's fetch time, not the time this worker happened to store it
+        remaining = (self.ttl if ttl is None else ttl) - forecast.age()
+        if remaining <= 0:
+            return
+        try:
+            self.backend.set(self.encode_key(key), forecast.to_bytes(), remaining)
+            self._count('writes')
+        except Exception as e:
+            logger.warning(f"Shared cache write failed: {e}")
+            self._count('errors')
+
+    def claim(self, key, wait=None):
+        # Returns (forecast, None) when another worker fetched it meanwhile, (None, owner) when
+        # this caller holds the fetch lease, or (None, None) when waiting timed out.
+        # wait shortens the lease wait, e.g. to what is left of the caller's deadline
+        lease_key = f"{KEY_PREFIX}lease:{key!r}"
+        owner = f"{process_id()}:{threading.get_ident()}"
+        wait = self.lease_wait if wait is None else max(0.0, min(self.lease_wait, wait))
+        deadline = time.monotonic() + wait
+        waited = False
+        while True:
+            try:
+                if self.backend.acquire(lease_key, owner, self.lease_ttl):
+                    return None, owner
+            except Exception as e:
+                logger.warning(f"Shared cache lease failed: {e}")
+                self._count('errors')
+                return None, None
+            if not waited:
+                waited = True
+                self._count('waits')
+            if time.monotonic() >= deadline:
+                return None, None
+            time.sleep(POLL_INTERVAL)
+            try:
+                data = self.backend.get(self.encode_key(key))
+            except Exception:
+                data = None
+            if data is not None:
+                self._count('hits')
+                return Forecast.from_bytes(data), None
+
+    def release(self, key, owner):
+        try:
+            self.backend.release(f"{KEY_PREFIX}lease:{key!r}", owner)
+        except Exception as e:
+            logger.warning(f"Shared cache lease release failed: {e}")
+
+    def is_leader(self, role, ttl):
+        # One process per role across all workers, e.g. the single background warmer
+        try:
+            return self.backend.acquire(f"{KEY_PREFIX}leader:{role}", process_id(), ttl)
+        except Exception as e:
+            logger.warning(f"Shared cache leader election failed: {e}")
+            return False
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'writes': self.writes,
+                'waits': self.waits,
+                'errors': self.errors,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+
+shared_cache = SharedForecastCache(open_backend(SHARED_CACHE_URL)) if SHARED_CACHE_URL else None
+if shared_cache is not None:
+    registry.register_cache('shared', shared_cache.stats)
@@ -0,0 +1,71 @@
+import threading
+
+# --------------------------
+# Single-Flight Call Coalescing
+# --------------------------
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    # Concurrent do() calls with the same key share one execution of fn and its result
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.calls = 0
+        self.executions = 0
+        self.deduplicated = 0
+        self.timed_out = 0
+
+    def do(self, key, fn, *args, timeout=None, **kwargs):
+        # timeout bounds how long a follower waits for the leader; TimeoutError when it passes
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.deduplicated += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            if not call.done.wait(timeout):
+                with self._lock:
+                    self.timed_out += 1
+                raise TimeoutError(f"Timed out waiting for in-flight call {key!r}")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'executions': self.executions,
+                'deduplicated': self.deduplicated,
+                'timed_out': self.timed_out,
+                'in_flight': len(self._calls),
+            }
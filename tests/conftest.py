@@ -0,0 +1,27 @@
+import pytest
+
+VIEW = dict(variables=['dew_point_2m', 'cloud_cover', 'precipitation_probability'], forecast_days=1)
+
+
+@pytest.fixture
+def stand_in(tmp_path, monkeypatch):
+    # Fetch layer pointed at a local stand-in, with an empty HTTP cache and a circuit breaker of
+    # its own so injected failures do not open the process-wide one. Imported here because the
+    # stand-in needs openmeteo_sdk, which tests that do not fetch can run without
+    pytest.importorskip('requests_cache')
+    pytest.importorskip('openmeteo_sdk')
+    import weather_client
+    import weather_fetcher
+    from benchmarks.fake_openmeteo import FakeOpenMeteo
+    from forecast_cache import forecast_cache
+    from upstream_guard import CircuitBreaker, upstream_guard
+
+    with FakeOpenMeteo() as server:
+        monkeypatch.setattr(weather_fetcher, 'FORECAST_URL', server.url)
+        monkeypatch.setattr(weather_client, 'CACHE_NAME', str(tmp_path / 'http_cache'))
+        monkeypatch.setattr(upstream_guard, 'breaker', CircuitBreaker(threshold=100))
+        weather_client.close_client()
+        forecast_cache.clear()
+        yield server
+        weather_client.close_client()
+        forecast_cache.clear()
@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+import forecast_analytics as analytics
+from forecast import Forecast
+from forecast_analytics import ForecastGrid
+
+# Midnight UTC, so hour i of a grid starting here is hour i of the first day
+START = 1792281600
+HOUR = 3600
+VARIABLES = ['temperature_2m', 'dew_point_2m', 'precipitation_probability', 'weather_code']
+
+
+def make_forecast(start=START, hours=48, **values):
+    variables = {}
+    for name in VARIABLES:
+        column = np.full(hours, np.nan, dtype=np.float32)
+        if name in values:
+            column[:] = values[name]
+        variables[name] = column
+    return Forecast(start, HOUR, hours, variables)
+
+
+def make_grid(forecasts):
+    return ForecastGrid.from_forecasts(forecasts, VARIABLES)
+
+
+@pytest.fixture
+def grid():
+    warm = make_forecast(temperature_2m=np.arange(48), dew_point_2m=5,
+                         precipitation_probability=[0, 60, 70, 0, 80, 90, 100] + [0] * 41,
+                         weather_code=[61] * 5 + [0] * 43)
+    cold = make_forecast(start=START + 24 * HOUR, hours=24, temperature_2m=-5, dew_point_2m=-6,
+                         precipitation_probability=50, weather_code=[95] + [3] * 23)
+    # A city that failed to fetch
+    return make_grid({'warm': warm, 'cold': cold, 'missing': None})
+
+
+def test_grid_aligns_forecasts_on_one_time_axis(grid):
+    assert grid.hours == 48 and len(grid) == 3
+    cold = analytics.temperature(grid)[1]
+    assert np.isnan(cold[:24]).all() and (cold[24:] == -5).all()
+    assert np.isnan(grid.values[2]).all()
+    assert analytics.dew_point_spread(grid)[0, 10] == 5
+
+
+def test_daily_stats_are_per_utc_day(grid):
+    stats = analytics.daily_stats(grid)
+    assert stats['days'].tolist() == [START, START + 86400]
+    assert stats['min'][0].tolist() == [0, 24]
+    assert stats['max'][0].tolist() == [23, 47]
+    assert np.isnan(stats['mean'][1, 0]) and stats['mean'][1, 1] == -5
+    assert np.isnan(stats['min'][2]).all()
+
+
+def test_precipitation_windows(grid):
+    windows = analytics.precipitation_windows(grid, threshold=50)
+    assert windows['wet_hours'].tolist() == [5, 24, 0]
+    assert windows['longest_run'].tolist() == [3, 24, 0]
+    assert windows['longest_run_start'].tolist() == [START + 4 * HOUR, START + 24 * HOUR, -1]
+
+
+def test_expected_wet_hours_is_nan_without_data(grid):
+    expected = analytics.expected_wet_hours(grid)
+    assert expected[0] == pytest.approx(4.0)
+    assert expected[1] == pytest.approx(12.0)
+    assert np.isnan(expected[2])
+
+
+def test_weather_code_summary(grid):
+    summary = analytics.weather_code_summary(grid)
+    rain, clear, cloudy, storm = (analytics.WEATHER_CATEGORIES.index(name)
+                                  for name in ('rain', 'clear', 'cloudy', 'thunderstorm'))
+    assert summary['counts'][0, rain] == 5 and summary['counts'][0, clear] == 43
+    assert summary['dominant'].tolist() == [clear, cloudy, -1]
+    assert summary['worst'].tolist() == [rain, storm, -1]
+
+
+def test_rankings(grid):
+    assert analytics.warmest(grid, hours=48, start=START) == [('warm', 47.0), ('cold', -5.0)]
+    assert analytics.coldest(grid, hours=48, start=START, n=1) == [('cold', -5.0)]
+    # Only the first day: the cold city has no data yet and is left out
+    assert analytics.wettest(grid, hours=24, start=START) == [('warm', pytest.approx(4.0))]
+    assert analytics.rank(grid, [np.nan, np.nan, np.nan]) == []
+
+
+def test_all_nan_grid():
+    grid = make_grid({'a': make_forecast(hours=24), 'b': None})
+    assert grid.hours == 24
+    assert analytics.weather_code_summary(grid)['worst'].tolist() == [-1, -1]
+    assert np.isnan(analytics.expected_wet_hours(grid)).all()
+    assert np.isnan(analytics.daily_stats(grid)['max']).all()
+    assert analytics.precipitation_windows(grid)['longest_run_start'].tolist() == [-1, -1]
+    assert analytics.warmest(grid, start=START) == []
+
+
+def test_zero_hour_grid():
+    for grid in (make_grid({'a': None, 'b': None}), make_grid({})):
+        assert grid.hours == 0
+        summary = analytics.weather_code_summary(grid)
+        assert summary['counts'].shape == (len(grid), len(analytics.WEATHER_CATEGORIES))
+        assert summary['worst'].tolist() == [-1] * len(grid)
+        assert summary['dominant'].tolist() == [-1] * len(grid)
+        assert analytics.precipitation_windows(grid)['wet_hours'].tolist() == [0] * len(grid)
+        assert np.isnan(analytics.expected_wet_hours(grid)).all()
+        assert len(analytics.daily_stats(grid)['days']) == 0
+        assert analytics.wettest(grid) == []
+        assert analytics.warmest(grid) == []
+        assert analytics.coldest(grid) == []
@@ -0,0 +1,63 @@
+import asyncio
+import time
+import pytest
+
+pytest.importorskip('aiohttp')
+pytest.importorskip('openmeteo_sdk')
+
+import async_fetcher
+from async_fetcher import AsyncWeatherClient
+from conftest import VIEW
+from upstream_guard import upstream_guard
+
+
+@pytest.fixture(autouse=True)
+def async_stand_in(stand_in, monkeypatch):
+    # The async client imports FORECAST_URL by name
+    monkeypatch.setattr(async_fetcher, 'FORECAST_URL', stand_in.url)
+
+
+def fetch_all(coords, concurrency, **options):
+    async def run():
+        async with AsyncWeatherClient(concurrency=concurrency) as client:
+            forecasts = await asyncio.gather(
+                *(client.fetch_forecast(lat, lon, **options, **VIEW) for lat, lon in coords)
+            )
+            return forecasts, client._semaphore._value
+
+    return asyncio.run(run())
+
+
+def test_async_fetch_through_stand_in(stand_in):
+    (forecast,), _ = fetch_all([(45.5, 9.2)], concurrency=2)
+    assert forecast is not None and len(forecast) == 24
+    # Upstream time comes from the Date header, whole seconds
+    assert forecast.fetched_at == int(forecast.fetched_at)
+    assert stand_in.requests == 1
+
+
+def test_outage_respects_budget_and_frees_slots(stand_in):
+    stand_in.outage(30)
+    start = time.perf_counter()
+    forecasts, free_slots = fetch_all([(10.5, 10.5), (20.5, 20.5)], concurrency=1, budget=0.5)
+    elapsed = time.perf_counter() - start
+    assert forecasts == [None, None]
+    # Both retried once, then gave up because the next backoff would outlast the budget. The
+    # single slot was free during each backoff, so neither waited out the other's retries
+    assert stand_in.requests == 4
+    assert elapsed < 0.5 + 0.3
+    assert free_slots == 1
+
+
+def test_deadline_is_not_an_upstream_failure(stand_in, monkeypatch):
+    # The slot is granted just as the budget runs out; the fetch ends before any request is sent
+    async def late_slot(client):
+        await client._semaphore.acquire()
+        await asyncio.sleep(0.3)
+
+    monkeypatch.setattr(AsyncWeatherClient, '_acquire_slot', late_slot)
+    (forecast,), free_slots = fetch_all([(30.5, 30.5)], concurrency=1, budget=0.2)
+    assert forecast is None
+    assert stand_in.requests == 0
+    assert upstream_guard.breaker.stats()['consecutive_failures'] == 0
+    assert free_slots == 1
@@ -0,0 +1,48 @@
+import os
+import threading
+import pytest
+
+from city_catalog import CityCatalog, build_catalog, ensure_catalog
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / 'cities.csv'
+    path.write_text(
+        'id,name,country,latitude,longitude\n'
+        '1,Paris,France,48.85,2.35\n'
+        '2,Zürich,Switzerland,47.37,8.54\n',
+        encoding='utf-8'
+    )
+    return str(path)
+
+
+def test_concurrent_builds_do_not_collide(csv_path, tmp_path):
+    # Several processes (gunicorn workers) may find the catalog missing at the same moment
+    db_path = str(tmp_path / 'catalog' / 'cities.sqlite')
+    errors = []
+
+    def build():
+        try:
+            build_catalog(csv_path, db_path)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=build) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert os.listdir(tmp_path / 'catalog') == ['cities.sqlite']
+    assert CityCatalog(db_path, csv_path, build=False).find('zurich').name == 'Zürich'
+
+
+def test_open_without_build(csv_path, tmp_path):
+    db_path = str(tmp_path / 'cities.sqlite')
+    with pytest.raises(FileNotFoundError):
+        CityCatalog(db_path, csv_path, build=False)
+    assert not os.path.exists(db_path)
+    assert ensure_catalog(csv_path, db_path) is True
+    assert ensure_catalog(csv_path, db_path) is False
+    assert len(CityCatalog(db_path, csv_path, build=False)) == 2
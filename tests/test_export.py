@@ -0,0 +1,94 @@
+import csv
+import os
+import numpy as np
+import pytest
+
+import bulk_export
+from city_catalog import City
+from conftest import VIEW
+from forecast import Forecast
+from refresh_schedule import refresh_index
+
+START = 1792281600
+CITIES = [City(f"c{i}", f"City {i}", 'XX', 10.5 + i, 20.5 + i) for i in range(6)]
+
+
+@pytest.fixture
+def offline(monkeypatch):
+    # Three hours per location without the network; latitudes in `failing` get no forecast
+    failing = set()
+
+    def fetch(latitude, longitude, variables=None, forecast_days=None, forecast_hours=None):
+        if latitude in failing:
+            return None
+        values = {name: np.full(3, latitude, dtype=np.float32) for name in variables}
+        return Forecast(START, 3600, 3, values, latitude, longitude, fetched_at=START)
+
+    monkeypatch.setattr(bulk_export, 'fetch_forecast_uncached', fetch)
+    return failing
+
+
+def exported_ids(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    assert rows[0][:len(bulk_export.LOCATION_COLUMNS)] == bulk_export.LOCATION_COLUMNS
+    return [row[0] for row in rows[1:]]
+
+
+def test_export_leaves_caches_untouched(stand_in, tmp_path):
+    from forecast_cache import forecast_cache, stale_cache
+    output = str(tmp_path / 'out.csv')
+    cities = CITIES[:2]
+    cached = len(forecast_cache), len(stale_cache)
+    stats = bulk_export.export_forecasts(cities, output, variables=VIEW['variables'], forecast_days=1)
+    assert stats == {'exported': 2, 'skipped': 0, 'failed': 0}
+    assert (len(forecast_cache), len(stale_cache)) == cached
+    assert all(refresh_index.due_at((city.latitude, city.longitude)) is None for city in cities)
+    # Nothing in the HTTP cache either: a second export goes back to upstream
+    bulk_export.export_forecasts(cities, output, variables=VIEW['variables'], forecast_days=1)
+    assert stand_in.requests == 4
+
+
+def test_csv_resume_discards_half_written_location(offline, tmp_path):
+    output = str(tmp_path / 'out.csv')
+    offline.add(CITIES[1].latitude)
+    stats = bulk_export.export_forecasts(CITIES[:3], output, workers=1)
+    assert stats == {'exported': 2, 'skipped': 0, 'failed': 1}
+    # A crash mid-location: rows past the last recorded offset and a cut-off progress line
+    with open(output, 'a', encoding='utf-8') as f:
+        f.write('c9,City 9,XX,1.0,1.0,2026-10-18T00:00:00Z,')
+    with open(bulk_export.progress_path(output), 'a', encoding='utf-8') as f:
+        f.write('c9\t99')
+
+    offline.clear()
+    stats = bulk_export.export_forecasts(CITIES[:3], output, workers=1, resume=True)
+    assert stats == {'exported': 1, 'skipped': 2, 'failed': 0}
+    ids = exported_ids(output)
+    assert sorted(ids) == ['c0'] * 3 + ['c1'] * 3 + ['c2'] * 3
+    assert ids[-3:] == ['c1'] * 3
+    with open(bulk_export.progress_path(output), encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    assert [line.split('\t')[0] for line in lines] == ['c0', 'c2', 'c1']
+    assert int(lines[-1].split('\t')[1]) == os.path.getsize(output)
+
+
+def test_parquet_resume_drops_unclosed_part_files(offline, tmp_path, monkeypatch):
+    pq = pytest.importorskip('pyarrow.parquet')
+    monkeypatch.setattr(bulk_export, 'ROW_GROUP_LOCATIONS', 1)
+    monkeypatch.setattr(bulk_export, 'FILE_LOCATIONS', 2)
+    output = str(tmp_path / 'parts')
+    stats = bulk_export.export_forecasts(CITIES[:4], output, fmt='parquet', workers=1)
+    assert stats['exported'] == 4
+    assert sorted(os.listdir(output)) == ['part-00000.parquet', 'part-00001.parquet']
+    # A part file the interrupted run never closed: no footer, and none of its locations recorded
+    with open(os.path.join(output, 'part-00002.parquet'), 'wb') as f:
+        f.write(b'PAR1 unfinished')
+
+    stats = bulk_export.export_forecasts(CITIES, output, fmt='parquet', workers=1, resume=True)
+    assert stats == {'exported': 2, 'skipped': 4, 'failed': 0}
+    parts = sorted(os.listdir(output))
+    assert parts == ['part-00000.parquet', 'part-00001.parquet', 'part-00002.parquet']
+    ids = []
+    for part in parts:
+        ids += pq.read_table(os.path.join(output, part), columns=['location_id'])['location_id'].to_pylist()
+    assert sorted(ids) == sorted(city.id for city in CITIES for _ in range(3))
@@ -0,0 +1,135 @@
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler
+import numpy as np
+import pytest
+
+pytest.importorskip('requests_cache')
+pytest.importorskip('openmeteo_sdk')
+
+import weather_fetcher
+from conftest import VIEW
+from forecast import Forecast
+from forecast_cache import (
+    CACHE_TTL, MODEL_RUN_INTERVAL, forecast_cache, forecast_key, model_run_for, next_refresh_at
+)
+from refresh_schedule import RefreshIndex, refresh_index
+from shared_cache import SharedForecastCache, SQLiteBackend
+
+
+def test_fetch_forecast_through_stand_in(stand_in):
+    forecast = weather_fetcher.fetch_forecast(48.85, 2.35, **VIEW)
+    assert forecast is not None
+    assert forecast.columns == VIEW['variables']
+    assert len(forecast) == 24
+    assert stand_in.requests == 1
+
+    # Served from memory; the stand-in sees no second request
+    assert weather_fetcher.fetch_forecast(48.85, 2.35, **VIEW) is forecast
+    assert stand_in.requests == 1
+
+
+def test_cached_only_does_not_reach_upstream(stand_in):
+    assert weather_fetcher.fetch_forecast(-33.87, 151.21, cached_only=True, **VIEW) is None
+    assert stand_in.requests == 0
+
+
+def test_batch_fetch_through_stand_in(stand_in):
+    coords = [(40.71, -74.01), (51.51, -0.13), (35.68, 139.69)]
+    forecasts = weather_fetcher.fetch_forecast_batch(coords, **VIEW)
+    assert set(forecasts) == set(coords)
+    assert all(forecast is not None and len(forecast) == 24 for forecast in forecasts.values())
+    # One chunk, one upstream request
+    assert stand_in.requests == 1
+    # Arrays are copied out of the shared body, so nbytes is what each cached forecast holds
+    for forecast in forecasts.values():
+        assert all(forecast[name].flags.owndata for name in forecast.columns)
+        assert forecast.nbytes == 24 * 4 * len(VIEW['variables'])
+
+
+def test_force_refresh_reaches_upstream(stand_in):
+    # The stand-in sends no ETag or Last-Modified, so a forced refresh must be a full fetch
+    assert weather_fetcher.fetch_forecast(52.52, 13.41, **VIEW) is not None
+    assert weather_fetcher.fetch_forecast(52.52, 13.41, force_refresh=True, **VIEW) is not None
+    assert stand_in.requests == 2
+    batch = weather_fetcher.fetch_forecast_batch([(52.52, 13.41)], force_refresh=True, **VIEW)
+    assert batch[(52.52, 13.41)] is not None
+    assert stand_in.requests == 3
+
+
+def test_http_cache_redecode_keeps_upstream_time(stand_in):
+    first = weather_fetcher.fetch_forecast(41.9, 12.5, **VIEW)
+    time.sleep(1.1)
+    forecast_cache.clear()
+    # Decoded again from the HTTP cache: same upstream time, not the decode time
+    again = weather_fetcher.fetch_forecast(41.9, 12.5, **VIEW)
+    assert stand_in.requests == 1
+    assert again is not first
+    assert again.fetched_at == first.fetched_at
+    assert again.age() >= 1.0
+
+
+def test_version_survives_redecode(stand_in):
+    first = weather_fetcher.fetch_forecast(59.5, 18.0, **VIEW)
+    time.sleep(1.1)
+    forecast_cache.clear()
+    # Renders are cached per version, so re-decoding the same response must not invalidate them
+    again = weather_fetcher.fetch_forecast(59.5, 18.0, **VIEW)
+    assert again.version == first.version
+    assert type(first).from_bytes(first.to_bytes()).version == first.version
+    # A real upstream fetch a second later is a new version
+    refreshed = weather_fetcher.fetch_forecast(59.5, 18.0, force_refresh=True, **VIEW)
+    assert stand_in.requests == 2
+    assert refreshed.version != first.version
+
+
+def test_refresh_is_scheduled_from_upstream_time(stand_in, monkeypatch):
+    # Upstream answers with a response produced during the previous model run
+    produced = time.time() - MODEL_RUN_INTERVAL
+    monkeypatch.setattr(BaseHTTPRequestHandler, 'date_time_string',
+                        lambda handler, timestamp=None: formatdate(produced, usegmt=True))
+    forecast = weather_fetcher.fetch_forecast(48.5, 2.5, **VIEW)
+    assert forecast.fetched_at == int(produced)
+    cell = (forecast.latitude, forecast.longitude)
+    # Already due, where decode time would have pushed it a whole run into the future
+    assert refresh_index.due_at(cell) == next_refresh_at(forecast.fetched_at)
+    assert refresh_index.due_at(cell) <= time.time() < next_refresh_at(time.time())
+
+
+def cached_forecast(latitude, longitude, fetched_at):
+    projection = weather_fetcher.make_projection(**VIEW)
+    variables = {name: np.zeros(24, dtype=np.float32) for name in projection.variables}
+    forecast = Forecast(int(fetched_at) // 3600 * 3600, 3600, 24, variables, latitude, longitude, fetched_at)
+    return projection, forecast
+
+
+def test_store_hit_is_scheduled_for_refresh(stand_in, tmp_path, monkeypatch):
+    # After a restart the current run comes from the store; the warmer must still refresh it
+    pytest.importorskip('pyarrow')
+    from forecast_store import ForecastStore
+    store = ForecastStore(str(tmp_path / 'store'), weather_fetcher.HOURLY_VARIABLES)
+    index = RefreshIndex()
+    monkeypatch.setattr(weather_fetcher, 'forecast_store', store)
+    monkeypatch.setattr(weather_fetcher, 'refresh_index', index)
+    projection, stored = cached_forecast(47.5, 3.5, time.time())
+    store.write((47.5, 3.5), 47.5, 3.5, projection, stored, model_run_for())
+
+    forecast = weather_fetcher.fetch_forecast(47.5, 3.5, **VIEW)
+    assert forecast.fetched_at == stored.fetched_at
+    assert stand_in.requests == 0
+    assert index.due_at((47.5, 3.5)) == next_refresh_at(stored.fetched_at)
+
+
+def test_shared_cache_hit_is_scheduled_for_refresh(stand_in, tmp_path, monkeypatch):
+    # A forecast fetched by another worker is refreshed by whichever worker leads the warmer
+    shared = SharedForecastCache(SQLiteBackend(str(tmp_path / 'shared.sqlite')))
+    index = RefreshIndex()
+    monkeypatch.setattr(weather_fetcher, 'shared_cache', shared)
+    monkeypatch.setattr(weather_fetcher, 'refresh_index', index)
+    projection, shared_forecast = cached_forecast(46.5, 4.5, time.time())
+    shared.put(forecast_key(46.5, 4.5, projection), shared_forecast, ttl=CACHE_TTL)
+
+    forecast = weather_fetcher.fetch_forecast(46.5, 4.5, **VIEW)
+    assert forecast.fetched_at == shared_forecast.fetched_at
+    assert stand_in.requests == 0
+    assert index.due_at((46.5, 4.5)) == next_refresh_at(shared_forecast.fetched_at)
@@ -0,0 +1,35 @@
+from grid_index import GridIndex
+
+
+def test_alias_only_by_default():
+    index = GridIndex(resolution=None)
+    assert index.learn(48.8566, 2.3522, 48.86, 2.34000001) == (48.86, 2.34)
+    # The coordinates upstream mapped, and the cell itself, resolve to the cell
+    assert index.snap(48.8566, 2.3522) == (48.86, 2.34)
+    assert index.snap(48.86, 2.34) == (48.86, 2.34)
+    # A neighbouring query may belong to another cell; it is fetched, not guessed
+    assert index.snap(48.87, 2.35) is None
+    assert len(index) == 1
+    stats = index.stats()
+    assert (stats['snapped'], stats['unknown'], stats['aliases']) == (2, 1, 2)
+
+
+def test_snaps_within_half_a_spacing_when_resolution_is_set():
+    index = GridIndex(resolution=0.025)
+    index.learn(45.0, 7.0, 45.0, 7.0)
+    index.learn(45.03, 7.0, 45.025, 7.0)
+    assert index.snap(45.011, 7.005) == (45.0, 7.0)
+    assert index.snap(45.014, 7.005) == (45.025, 7.0)
+    # Further than half a spacing from every known cell
+    assert index.snap(45.0, 7.02) is None
+    # Snapped queries are remembered as aliases
+    assert index.stats()['aliases'] == 5
+
+
+def test_snaps_across_bucket_boundaries():
+    index = GridIndex(resolution=0.1)
+    index.learn(0.0, 0.0, -0.04, 0.04)
+    # The query's bucket is (0, 0) while the cell sits in (-1, 0)
+    assert index.snap(0.005, 0.01) == (-0.04, 0.04)
+    assert index.snap(-0.04, 0.04) == (-0.04, 0.04)
+    assert index.snap(0.02, 0.1) is None
@@ -0,0 +1,64 @@
+import threading
+import time
+
+from prewarm import CacheWarmer
+from refresh_schedule import RefreshIndex
+
+LOCATIONS = [(61.5, 5.5), (62.5, 6.5), (63.5, 7.5)]
+
+
+class Leadership:
+    # leader(ttl) stand-in: records every lease request and grants it while `held` is set
+    def __init__(self, held=True):
+        self.held = threading.Event()
+        if held:
+            self.held.set()
+        self.leases = []
+
+    def __call__(self, ttl):
+        self.leases.append(ttl)
+        return self.held.is_set()
+
+
+def make_warmer(leader, fetched, **options):
+    def fetch(latitude, longitude, force_refresh=False):
+        fetched.append((latitude, longitude))
+        return object()
+
+    return CacheWarmer(LOCATIONS, fetch=fetch, leader=leader, index=RefreshIndex(), **options)
+
+
+def test_lease_is_short_and_renewed_during_a_cycle():
+    leader, fetched = Leadership(), []
+    warmer = make_warmer(leader, fetched, spread=0.6, lease=0.15)
+    assert warmer._lead()
+    warmer.run_cycle()
+    assert sorted(fetched) == LOCATIONS
+    # Submissions are about 0.2 s apart, longer than a third of the lease
+    assert len(leader.leases) >= 3
+    assert set(leader.leases) == {0.15}
+
+
+def test_lost_leadership_stops_the_cycle():
+    leader, fetched = Leadership(), []
+    warmer = make_warmer(leader, fetched, spread=0.6, lease=0.15)
+    assert warmer._lead()
+    leader.held.clear()
+    warmer.run_cycle()
+    assert len(fetched) == 1
+
+
+def test_follower_takes_over_within_the_lease():
+    leader, fetched = Leadership(held=False), []
+    warmer = make_warmer(leader, fetched, interval=3600, spread=0, lease=0.3)
+    warmer.start()
+    try:
+        time.sleep(0.15)
+        assert fetched == []
+        leader.held.set()
+        deadline = time.monotonic() + 1
+        while len(fetched) < len(LOCATIONS) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert sorted(fetched) == LOCATIONS
+    finally:
+        warmer.stop(1)
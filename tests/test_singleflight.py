@@ -0,0 +1,89 @@
+import threading
+import time
+
+from singleflight import SingleFlight
+
+CALLERS = 8
+
+
+class Gate:
+    # The leader's fn: signals when it starts and holds the flight open until released
+    def __init__(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        self.executions = 0
+
+    def __call__(self):
+        self.executions += 1
+        self.entered.set()
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def start_callers(flight, gate, timeout=None):
+    # One leader inside gate, then CALLERS - 1 followers on the same key; outcomes fill in as
+    # each thread finishes
+    outcomes = [None] * CALLERS
+
+    def caller(i):
+        try:
+            outcomes[i] = ('result', flight.do('key', gate, timeout=None if i == 0 else timeout))
+        except Exception as e:
+            outcomes[i] = ('error', e)
+
+    threads = [threading.Thread(target=caller, args=(i,)) for i in range(CALLERS)]
+    threads[0].start()
+    assert gate.entered.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    while flight.stats()['calls'] < CALLERS:
+        time.sleep(0.001)
+    return threads, outcomes
+
+
+def test_concurrent_callers_share_one_execution():
+    flight = SingleFlight()
+    gate = Gate(result='forecast')
+    threads, outcomes = start_callers(flight, gate)
+    gate.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert outcomes == [('result', 'forecast')] * CALLERS
+    assert gate.executions == 1
+    stats = flight.stats()
+    assert stats['executions'] == 1
+    assert stats['deduplicated'] == CALLERS - 1
+    assert stats['in_flight'] == 0
+
+
+def test_followers_get_the_leaders_exception():
+    error = ConnectionError('upstream down')
+    gate = Gate(error=error)
+    threads, outcomes = start_callers(SingleFlight(), gate)
+    gate.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert outcomes == [('error', error)] * CALLERS
+    assert gate.executions == 1
+
+
+def test_followers_time_out_waiting_for_the_leader():
+    flight = SingleFlight()
+    gate = Gate(result='forecast')
+    threads, outcomes = start_callers(flight, gate, timeout=0.05)
+    # Followers give up while the leader is still running
+    for thread in threads[1:]:
+        thread.join(5)
+    assert all(kind == 'error' and isinstance(e, TimeoutError) for kind, e in outcomes[1:])
+    assert flight.stats()['timed_out'] == CALLERS - 1
+
+    gate.release.set()
+    threads[0].join(5)
+    assert outcomes[0] == ('result', 'forecast')
+    assert flight.stats()['executions'] == 1
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from forecast import Forecast
+from forecast_store import ForecastStore
+from weather_fetcher import make_projection
+
+START = 1792281600
+PROJECTION = make_projection(['cloud_cover'], forecast_days=1)
+
+
+def make_forecast(latitude, longitude, fetched_at, offset=0.0):
+    values = np.arange(24, dtype=np.float32) + offset
+    return Forecast(START, 3600, 24, {'cloud_cover': values}, latitude, longitude, fetched_at=fetched_at)
+
+
+def write(store, forecast, model_run=100):
+    cell = (forecast.latitude, forecast.longitude)
+    return store.write(cell, *cell, PROJECTION, forecast, model_run)
+
+
+def test_read_is_scoped_to_the_location_partition(tmp_path):
+    store = ForecastStore(str(tmp_path), ['cloud_cover'])
+    write(store, make_forecast(1.0, 1.0, 1000.0))
+    write(store, make_forecast(2.0, 2.0, 1000.0, offset=50))
+    assert all('location=1.00_1.00' in path for path in store.dataset(1.0, 1.0).files)
+
+    frame = store.read(1.0, 1.0)
+    assert set(frame['location']) == {'1.00_1.00'}
+    assert frame['cloud_cover'].tolist() == list(range(24))
+    assert len(store.read()) == 48
+    assert len(store.read(3.0, 3.0)) == 0
+
+
+def test_redecoded_response_is_not_written_again(tmp_path):
+    store = ForecastStore(str(tmp_path), ['cloud_cover'])
+    assert write(store, make_forecast(1.0, 1.0, 1000.0)) == 24
+    # Same upstream response time: a re-decode of the stored run, or an older response
+    assert write(store, make_forecast(1.0, 1.0, 1000.0)) == 0
+    assert write(store, make_forecast(1.0, 1.0, 999.0, offset=1)) == 0
+    # A newer response only writes the hours that changed
+    changed = make_forecast(1.0, 1.0, 2000.0)
+    changed['cloud_cover'][:3] += 1
+    assert write(store, changed, model_run=101) == 3
+    loaded = store.load_forecast(1.0, 1.0, PROJECTION, 101)
+    assert loaded.fetched_at == 2000.0
+    assert loaded['cloud_cover'][:4].tolist() == [1, 2, 3, 3]
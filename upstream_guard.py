@@ -0,0 +1,262 @@
+import contextvars
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# --------------------------
+# Guard Configuration
+# --------------------------
+# Upstream round trips per second and burst size. The bucket is per process, so with several
+# gunicorn workers the total is this times the worker count; <= 0 disables the limit
+RATE_LIMIT = float(os.environ.get('WEATHER_RATE_LIMIT', 10))
+RATE_BURST = int(os.environ.get('WEATHER_RATE_BURST', 20))
+# Consecutive failed round trips that open the circuit, and seconds before it lets one probe through
+BREAKER_THRESHOLD = int(os.environ.get('WEATHER_BREAKER_THRESHOLD', 5))
+BREAKER_RESET = float(os.environ.get('WEATHER_BREAKER_RESET', 30))
+# Longest a single attempt may take, however much of the caller's budget is left
+REQUEST_TIMEOUT = float(os.environ.get('WEATHER_REQUEST_TIMEOUT', 10))
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class UpstreamUnavailable(Exception):
+    # Raised instead of calling upstream; fetch functions turn it into None like any other failure
+    pass
+
+
+class CircuitOpen(UpstreamUnavailable):
+    pass
+
+
+class RateLimited(UpstreamUnavailable):
+    pass
+
+
+class DeadlineExceeded(UpstreamUnavailable, TimeoutError):
+    pass
+
+
+# --------------------------
+# Per-Call Deadlines
+# --------------------------
+_deadline = contextvars.ContextVar('weather_deadline', default=None)
+
+
+@contextmanager
+def deadline(seconds):
+    # Upstream calls made inside give up once `seconds` have passed; nested budgets keep the tighter
+    if seconds is None:
+        yield
+        return
+    expires = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(expires if current is None else min(current, expires))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining():
+    # Seconds left in the current call's budget, or None when it has none
+    expires = _deadline.get()
+    return None if expires is None else expires - time.monotonic()
+
+
+# --------------------------
+# Token-Bucket Rate Limiter
+# --------------------------
+class TokenBucket:
+    # Refills `rate` tokens per second up to `burst`. reserve() books a token and returns how long
+    # until it is usable, so threads and asyncio tasks can share one bucket
+    def __init__(self, rate=RATE_LIMIT, burst=RATE_BURST):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self.granted = 0
+        self.delayed = 0
+        self.rejected = 0
+
+    def reserve(self, timeout=None):
+        # Seconds to wait for the booked token, or None (nothing booked) when that exceeds timeout
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = max(0.0, (1 - self._tokens) / self.rate)
+            if timeout is not None and wait > timeout:
+                self.rejected += 1
+                return None
+            # Tokens may go negative: later callers queue behind the ones already booked
+            self._tokens -= 1
+            self.granted += 1
+            if wait:
+                self.delayed += 1
+            return wait
+
+    def acquire(self, timeout=None):
+        wait = self.reserve(timeout)
+        if wait is None:
+            return False
+        if wait:
+            time.sleep(wait)
+        return True
+
+    def stats(self):
+        with self._lock:
+            return {'granted': self.granted, 'delayed': self.delayed, 'rejected': self.rejected}
+
+
+# --------------------------
+# Circuit Breaker
+# --------------------------
+class CircuitBreaker:
+    # Closed: calls pass and consecutive failures are counted. Open: calls fail fast until
+    # reset_timeout has passed. Half-open: one probe call decides between closed and open again
+    def __init__(self, threshold=BREAKER_THRESHOLD, reset_timeout=BREAKER_RESET):
+        self.threshold = max(1, threshold)
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._probe_started = 0.0
+        self.opened = 0
+        self.probes = 0
+        self.rejected = 0
+
+    def allow(self):
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            now = time.monotonic()
+            if self.state == OPEN and now - self._opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._probing = False
+            # A probe that never reported back (e.g. a cancelled task) is replaced after reset_timeout
+            if self.state == HALF_OPEN and (not self._probing or now - self._probe_started >= self.reset_timeout):
+                self._probing = True
+                self._probe_started = now
+                self.probes += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info("Upstream circuit closed")
+            self.state = CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self._failures >= self.threshold):
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+                self.opened += 1
+                logger.warning(
+                    "Upstream circuit opened after %d consecutive failures; failing fast for %ss",
+                    self._failures, self.reset_timeout
+                )
+
+    def stats(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'open': int(self.state == OPEN),
+                'half_open': int(self.state == HALF_OPEN),
+                'consecutive_failures': self._failures,
+                'opened': self.opened,
+                'probes': self.probes,
+                'rejected': self.rejected,
+            }
+
+
+# --------------------------
+# Upstream Guard
+# --------------------------
+class UpstreamGuard:
+    # Every network attempt is admitted here first: deadline, then rate limit, then breaker
+    def __init__(self, limiter=None, breaker=None, request_timeout=REQUEST_TIMEOUT):
+        self.limiter = limiter if limiter is not None else TokenBucket()
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.request_timeout = request_timeout
+        self._lock = threading.Lock()
+        self.deadline_exceeded = 0
+
+    def admit(self, timeout=None):
+        # Returns the timeout this attempt may use, or raises instead of calling upstream
+        wait = self.reserve()
+        if wait:
+            time.sleep(wait)
+        return self.attempt_timeout(timeout)
+
+    def reserve(self):
+        # First half of admit(): seconds to wait for a rate-limit token, without sleeping, so
+        # asyncio callers can await the wait instead
+        left = remaining()
+        if left is not None and left <= 0:
+            self._deadline_exceeded()
+        wait = self.limiter.reserve(left)
+        if wait is None:
+            raise RateLimited("Upstream rate limit leaves no room in the deadline")
+        return wait
+
+    def attempt_timeout(self, timeout=None):
+        # Second half of admit(), once the wait is over: breaker check and the attempt's timeout
+        left = remaining()
+        if left is not None and left <= 0:
+            self._deadline_exceeded()
+        if not self.breaker.allow():
+            raise CircuitOpen("Upstream circuit is open")
+        limit = self.request_timeout if left is None else min(self.request_timeout, left)
+        if timeout is None:
+            return limit
+        if isinstance(timeout, tuple):
+            return tuple(limit if part is None else min(part, limit) for part in timeout)
+        return min(timeout, limit)
+
+    def can_wait(self, delay):
+        # Whether a retry after `delay` still fits in the deadline
+        left = remaining()
+        return left is None or delay < left
+
+    def backoff(self, delay):
+        # Sleeps before a retry; False when the deadline would pass first, so the caller gives up
+        if not self.can_wait(delay):
+            return False
+        time.sleep(delay)
+        return True
+
+    def _deadline_exceeded(self):
+        with self._lock:
+            self.deadline_exceeded += 1
+        raise DeadlineExceeded("Deadline passed before the upstream call")
+
+    def stats(self):
+        with self._lock:
+            deadline_exceeded = self.deadline_exceeded
+        stats = {f"limiter_{key}": value for key, value in self.limiter.stats().items()}
+        stats.update({f"breaker_{key}": value for key, value in self.breaker.stats().items()})
+        stats['deadline_exceeded'] = deadline_exceeded
+        return stats
+
+
+upstream_guard = UpstreamGuard()
+registry.register_stats('weather_upstream', upstream_guard.stats)
@@ -0,0 +1,240 @@
+import logging
+import os
+import threading
+import time
+from functools import lru_cache
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError as RequestConnectionError, Timeout
+from urllib3 import HTTPConnectionPool, HTTPSConnectionPool
+from metrics import registry, stage_seconds
+from upstream_guard import upstream_guard
+
+logger = logging.getLogger(__name__)
+
+# --------------------------
+# Client Configuration
+# --------------------------
+CACHE_NAME = os.environ.get('WEATHER_HTTP_CACHE', '.cache')
+# Fallback only: fetches pass expire_after up to the next expected model run
+EXPIRE_AFTER = 86400
+POOL_SIZE = int(os.environ.get('WEATHER_POOL_SIZE', 10))
+# Retries happen in PooledAdapter.send, inside the caller's deadline and behind the circuit breaker
+RETRIES = 5
+BACKOFF_FACTOR = 0.2
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_lock = threading.Lock()
+_session = None
+_client = None
+_pool_size = POOL_SIZE
+
+
+# --------------------------
+# Connection Counters
+# --------------------------
+class ConnectionStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.checkouts = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def record_open(self):
+        with self._lock:
+            self.opened += 1
+
+    def record_checkout(self):
+        with self._lock:
+            self.checkouts += 1
+
+    def record_response(self, from_cache):
+        with self._lock:
+            if from_cache:
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+
+    def reset(self):
+        with self._lock:
+            self.opened = 0
+            self.checkouts = 0
+            self.cache_hits = 0
+            self.cache_misses = 0
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'opened': self.opened,
+                'reused': max(self.checkouts - self.opened, 0),
+                'checkouts': self.checkouts,
+                'cache_hits': self.cache_hits,
+                'cache_misses': self.cache_misses,
+            }
+
+
+connection_stats = ConnectionStats()
+
+
+# Connection pools that count how often a checkout needed a brand new socket
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    def _new_conn(self):
+        connection_stats.record_open()
+        return super()._new_conn()
+
+    def _get_conn(self, timeout=None):
+        connection_stats.record_checkout()
+        return super()._get_conn(timeout=timeout)
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    def _new_conn(self):
+        connection_stats.record_open()
+        return super()._new_conn()
+
+    def _get_conn(self, timeout=None):
+        connection_stats.record_checkout()
+        return super()._get_conn(timeout=timeout)
+
+
+def retry_delay(response, attempt):
+    # Exponential backoff, or the server's Retry-After (in seconds) when it sends one
+    delay = BACKOFF_FACTOR * (2 ** attempt)
+    try:
+        return max(delay, float(response.headers.get('Retry-After', 0)))
+    except (TypeError, ValueError):
+        return delay
+
+
+class PooledAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _CountingHTTPConnectionPool,
+            'https': _CountingHTTPSConnectionPool,
+        }
+
+    def send(self, request, timeout=None, **kwargs):
+        # HTTP-cache hits never reach the adapter, so the rate limit, circuit breaker and deadline
+        # only apply to real round trips. Each attempt is admitted separately, and retries stop as
+        # soon as the breaker opens or the backoff would outlast the deadline
+        attempt = 0
+        while True:
+            attempt_timeout = upstream_guard.admit(timeout)
+            try:
+                response = super().send(request, timeout=attempt_timeout, **kwargs)
+            except (RequestConnectionError, Timeout):
+                upstream_guard.breaker.record_failure()
+                if attempt >= RETRIES or not upstream_guard.backoff(BACKOFF_FACTOR * (2 ** attempt)):
+                    raise
+            except Exception:
+                upstream_guard.breaker.record_failure()
+                raise
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    upstream_guard.breaker.record_success()
+                    return response
+                upstream_guard.breaker.record_failure()
+                if attempt >= RETRIES or not upstream_guard.backoff(retry_delay(response, attempt)):
+                    return response
+                response.close()
+            attempt += 1
+
+
+@lru_cache(maxsize=None)
+def _session_class():
+    # Defined on first use so importing this module does not load requests_cache
+    import requests_cache
+
+    class InstrumentedSession(requests_cache.CachedSession):
+        # Times every request as either an HTTP-cache (SQLite) hit or a network round trip
+        def send(self, request, **kwargs):
+            start = time.perf_counter()
+            response = super().send(request, **kwargs)
+            from_cache = getattr(response, 'from_cache', False)
+            stage_seconds.observe('http_cache' if from_cache else 'network', time.perf_counter() - start)
+            connection_stats.record_response(from_cache)
+            return response
+
+    return InstrumentedSession
+
+
+# --------------------------
+# Shared Session and Client
+# --------------------------
+def _build_session(pool_size):
+    # WAL lets several worker processes read the SQLite HTTP cache while one writes
+    session = _session_class()(CACHE_NAME, expire_after=EXPIRE_AFTER, wal=True)
+    adapter = PooledAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        pool_block=False,
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def _new_client(session):
+    # openmeteo_requests (and its flatbuffers SDK) is only imported once a client is needed
+    import openmeteo_requests
+    return openmeteo_requests.Client(session=session)
+
+
+def configure_client(pool_size=None):
+    # Replace the shared client, e.g. to resize the pool before the app starts serving
+    global _session, _client, _pool_size
+    with _lock:
+        if pool_size is not None:
+            _pool_size = pool_size
+        old_session = _session
+        _session = _build_session(_pool_size)
+        _client = _new_client(_session)
+    if old_session is not None:
+        old_session.close()
+    logger.info(f"Configured Open-Meteo client with pool size {_pool_size}")
+    return _client
+
+
+def get_session():
+    get_client()
+    return _session
+
+
+def get_client():
+    client = _client
+    if client is not None:
+        return client
+    with _lock:
+        if _client is None:
+            _init_locked()
+        return _client
+
+
+def _init_locked():
+    global _session, _client
+    _session = _build_session(_pool_size)
+    _client = _new_client(_session)
+    logger.info(f"Created shared Open-Meteo client with pool size {_pool_size}")
+
+
+def close_client():
+    global _session, _client
+    with _lock:
+        session = _session
+        _session = None
+        _client = None
+    if session is not None:
+        session.close()
+
+
+def get_connection_stats():
+    stats = connection_stats.snapshot()
+    stats['pool_size'] = _pool_size
+    return stats
+
+
+registry.register_cache('http', lambda: {
+    'hits': connection_stats.cache_hits, 'misses': connection_stats.cache_misses
+})
+registry.register_stats('weather_http_connections', get_connection_stats)
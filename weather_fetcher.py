@@ -1,97 +1,464 @@
 import logging
-import pandas as pd
-import openmeteo_requests
-import requests_cache
-from retry_requests import retry
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor
+from requests import Request
+from weather_client import get_session
+from forecast import Forecast
+from forecast_cache import (
+    CACHE_TTL, forecast_cache, forecast_key, location_key, model_run_for, next_refresh_at, stale_cache,
+    store_forecast
+)
+from grid_index import grid_index
+from metrics import registry, span
+from refresh_schedule import refresh_index
+from shared_cache import shared_cache
+from singleflight import SingleFlight
+from upstream_guard import UpstreamUnavailable, deadline, remaining
+from weather_logging import configure_logging, timed
 
-# Set pandas display options to show all columns
-pd.set_option('display.max_columns', None)
-pd.set_option('display.width', None)
-pd.set_option('display.max_rows', 5)
+# Handlers are installed by the entry point via configure_logging(), not at import
+logger = logging.getLogger(__name__)
 
 # --------------------------
-# Logging Configuration
+# Request Parameters
 # --------------------------
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    filename='msba_weather_app.log',
-    filemode='w'
-)
-logger = logging.getLogger(__name__)
+FORECAST_URL = os.environ.get('WEATHER_FORECAST_URL', "https://api.open-meteo.com/v1/forecast")
+HOURLY_VARIABLES = [
+    "precipitation_probability", "cloud_cover", "relative_humidity_2m",
+    "wind_speed_180m", "dew_point_2m", "wind_gusts_10m",
+    "surface_pressure", "pressure_msl", "weather_code",
+    "temperature_2m"
+]
+
+# Which hourly variables and how much of the horizon a request covers; part of every cache key
+Projection = namedtuple('Projection', ['variables', 'forecast_days', 'forecast_hours'])
+
+
+def make_projection(variables=None, forecast_days=None, forecast_hours=None):
+    variables = tuple(HOURLY_VARIABLES if variables is None else variables)
+    unknown = [name for name in variables if name not in HOURLY_VARIABLES]
+    if unknown:
+        raise ValueError(f"Unknown hourly variables: {', '.join(unknown)}")
+    return Projection(variables, forecast_days, forecast_hours)
+
+
+FULL_PROJECTION = make_projection()
+
+
+def projection_params(projection):
+    params = {"hourly": list(projection.variables)}
+    if projection.forecast_days is not None:
+        params["forecast_days"] = projection.forecast_days
+    if projection.forecast_hours is not None:
+        params["forecast_hours"] = projection.forecast_hours
+    return params
+
+
+BATCH_SIZE = 50
+BATCH_WORKERS = 4
+
+# Stale-while-revalidate: serve a previous forecast up to MAX_STALE old while refreshing it
+MAX_STALE = float(os.environ.get('WEATHER_MAX_STALE', 86400))
+REVALIDATE_WORKERS = 4
+# Latency budget for a dashboard callback's fetch; past it the callback gets the stale forecast
+# or an error instead of waiting on upstream
+FETCH_BUDGET = float(os.environ.get('WEATHER_FETCH_BUDGET', 5))
+
+fetch_flights = SingleFlight()
+registry.register_stats('weather_fetch_flights', fetch_flights.stats)
+registry.register_stats('weather_refresh_index', refresh_index.stats)
+_revalidate_executor = ThreadPoolExecutor(max_workers=REVALIDATE_WORKERS, thread_name_prefix='weather-revalidate')
+_revalidating = set()
+_revalidating_lock = threading.Lock()
+
+ServedForecast = namedtuple('ServedForecast', ['forecast', 'age', 'stale'])
+
+# Optional on-disk history of every fetched forecast; also lets a restarted process pick up the
+# current model run and known grid cells without re-downloading. Unset keeps pyarrow unloaded
+STORE_DIR = os.environ.get('WEATHER_STORE_DIR')
+forecast_store = None
+if STORE_DIR:
+    from forecast_store import ForecastStore
+    forecast_store = ForecastStore(STORE_DIR, HOURLY_VARIABLES)
+    for query_latitude, query_longitude, cell_latitude, cell_longitude in forecast_store.cells():
+        grid_index.learn(query_latitude, query_longitude, cell_latitude, cell_longitude)
+
+# --------------------------
+# Response Parsing
+# --------------------------
+def parse_responses(data):
+    # Open-Meteo flatbuffers: each message is prefixed with its little-endian uint32 length
+    from openmeteo_sdk.WeatherApiResponse import WeatherApiResponse
+    responses = []
+    position = 0
+    while position < len(data):
+        length = int.from_bytes(data[position:position + 4], byteorder='little')
+        responses.append(WeatherApiResponse.GetRootAs(data, position + 4))
+        position += length + 4
+    return responses
+
+
+def refresh_option(session, params):
+    # requests-cache's refresh=True only revalidates a cached response that carries an ETag or
+    # Last-Modified; without one it returns the cached copy untouched, so force a full fetch instead
+    request = session.prepare_request(Request('GET', FORECAST_URL, params=params))
+    # The cache key includes `verify`, which requests resolves from the environment at send time
+    settings = session.merge_environment_settings(request.url, {}, None, None, None)
+    cached = session.cache.get_response(session.cache.create_key(request, **settings))
+    if cached is not None and (cached.headers.get('ETag') or cached.headers.get('Last-Modified')):
+        return {'refresh': True}
+    return {'force_refresh': True}
+
+
+def response_time(response):
+    # When upstream produced the response. A cached copy keeps the Date header, so re-decoding it
+    # from the HTTP cache does not make an old forecast look newly fetched
+    date = response.headers.get('Date')
+    if date:
+        try:
+            return min(parsedate_to_datetime(date).timestamp(), time.time())
+        except (TypeError, ValueError):
+            pass
+    created_at = getattr(response, 'created_at', None)
+    if created_at is not None:
+        # requests-cache stores naive UTC datetimes
+        return created_at.replace(tzinfo=timezone.utc).timestamp()
+    return time.time()
+
+
+def request_forecasts(params, refresh=False, **cache_options):
+    # One GET through the shared cached session, decoded here because openmeteo_requests'
+    # weather_api(url, params) cannot pass per-request cache options such as expire_after.
+    # refresh goes to upstream: conditionally when the cached copy allows it, in full otherwise.
+    # Returns (responses, time upstream produced them)
+    session = get_session()
+    params = {**params, 'format': 'flatbuffers'}
+    if refresh:
+        cache_options.update(refresh_option(session, params))
+    response = session.get(FORECAST_URL, params=params, **cache_options)
+    response.raise_for_status()
+    return parse_responses(response.content), response_time(response)
+
+
+def response_to_forecast(response, projection=FULL_PROJECTION, fetched_at=None, copy=False):
+    with span('decode'):
+        return Forecast.from_response(response, projection.variables, fetched_at=fetched_at, copy=copy)
+
+
+def response_to_dataframe(response, projection=FULL_PROJECTION):
+    return response_to_forecast(response, projection).to_dataframe()
+
+# --------------------------
+# Grid Cell Resolution
+# --------------------------
+def resolve_location(latitude, longitude):
+    # Nearby queries inside one known model grid cell share that cell's request and cache entry
+    cell = grid_index.snap(latitude, longitude)
+    return cell if cell is not None else (latitude, longitude)
+
+
+def http_expire_after(now=None):
+    # HTTP cache entries stay fresh until the next model run is expected to be published
+    now = time.time() if now is None else now
+    return max(60, int(next_refresh_at(now) - now))
+
+
+def adopt_forecast(latitude, longitude, projection, forecast, ttl=None):
+    # Every forecast this process takes on, whether fetched, loaded from the store or shared by
+    # another worker, is cached under the grid cell it reports and scheduled for refresh
+    cell = grid_index.learn(latitude, longitude, forecast.latitude, forecast.longitude)
+    store_forecast(*cell, projection, forecast, ttl=ttl)
+    # fetched_at is the upstream response time: a forecast re-decoded from the HTTP cache keeps the
+    # refresh slot and model run of the fetch that produced it instead of looking brand new
+    refresh_index.record(cell, forecast.fetched_at)
+    return cell
+
+
+def remember_forecast(latitude, longitude, projection, forecast):
+    # A freshly decoded response is also published to the other workers and the store
+    cell = adopt_forecast(latitude, longitude, projection, forecast)
+    if shared_cache is not None:
+        # Other worker processes pick it up under the cell and under the coordinates asked for
+        run = model_run_for(forecast.fetched_at)
+        shared_cache.put(forecast_key(*cell, projection, run), forecast)
+        if cell != (latitude, longitude):
+            shared_cache.put(forecast_key(latitude, longitude, projection, run), forecast)
+    if forecast_store is not None:
+        forecast_store.append((latitude, longitude), *cell, projection, forecast, model_run_for(forecast.fetched_at))
 
 # --------------------------
 # Weather Fetching Function
 # --------------------------
-def fetch_weather_data(latitude, longitude):
+def _fetch_and_parse(latitude, longitude, key, projection, force_refresh=False, cached_only=False):
+    # A flight that just finished may already have filled the cache
+    if not force_refresh:
+        forecast = forecast_cache.get(key, record=False)
+        if forecast is not None:
+            return forecast
+        # The persistent store may already hold this model run, e.g. after a restart
+        if forecast_store is not None:
+            with span('store'):
+                forecast = forecast_store.load_forecast(latitude, longitude, projection, model_run_for())
+            if forecast is not None:
+                adopt_forecast(latitude, longitude, projection, forecast)
+                return forecast
+
+    # Across worker processes only one fetches a given key; the others wait for its result
+    lease = None
+    if shared_cache is not None and not force_refresh:
+        forecast = shared_cache.get(key)
+        if forecast is None and not cached_only:
+            forecast, lease = shared_cache.claim(key, wait=remaining())
+        if forecast is not None:
+            adopt_forecast(latitude, longitude, projection, forecast, ttl=CACHE_TTL - forecast.age())
+            return forecast
+
     try:
-        # Setup cached session and retry strategy
-        cache_session = requests_cache.CachedSession('.cache', expire_after=86400)
-        retry_session = retry(cache_session, retries=5, backoff_factor=0.2)
-        openmeteo = openmeteo_requests.Client(session=retry_session)
+        return _fetch_upstream(latitude, longitude, projection, force_refresh, cached_only)
+    finally:
+        if lease is not None:
+            shared_cache.release(key, lease)
 
-        # Define API endpoint and parameters
-        url = "https://api.open-meteo.com/v1/forecast"
-        params = {
-            "latitude": latitude,
-            "longitude": longitude,
-            "hourly": [
-                "precipitation_probability", "cloud_cover", "relative_humidity_2m",
-                "wind_speed_180m", "dew_point_2m", "wind_gusts_10m",
-                "surface_pressure", "pressure_msl", "weather_code"
-            ]
-        }
 
-        responses = openmeteo.weather_api(url, params=params)
+def _fetch_upstream(latitude, longitude, projection, force_refresh=False, cached_only=False):
+    # Shared cached session with pooled keep-alive connections and retries
+    params = {
+        "latitude": latitude,
+        "longitude": longitude,
+        **projection_params(projection)
+    }
+
+    # force_refresh always reaches upstream (a conditional request when the cached response carries
+    # an ETag or Last-Modified, a full fetch otherwise); cached_only never touches the network
+    with timed('fetch', latitude=latitude, longitude=longitude, forced=force_refresh) as record:
+        responses, fetched_at = request_forecasts(
+            params, refresh=force_refresh, only_if_cached=cached_only, expire_after=http_expire_after()
+        )
         response = responses[0]
+        forecast = response_to_forecast(response, projection, fetched_at)
+        record['rows'] = len(forecast)
+        record['variables'] = len(projection.variables)
 
-        logger.info(f"Fetched data for {latitude}, {longitude}")
-
-        # Display metadata
-        print(f"Coordinates: {response.Latitude()}°N, {response.Longitude()}°E")
-        print(f"Elevation: {response.Elevation()} m asl")
-        print(f"Timezone: {response.Timezone()} {response.TimezoneAbbreviation()}")
-        print(f"UTC Offset: {response.UtcOffsetSeconds()} seconds")
-
-        # Process hourly data
-        hourly = response.Hourly()
-        variable_names = [
-            "precipitation_probability", "cloud_cover", "relative_humidity_2m",
-            "wind_speed_180m", "dew_point_2m", "wind_gusts_10m",
-            "surface_pressure", "pressure_msl", "weather_code"
-        ]
-
-        hourly_data = {
-            "date": pd.date_range(
-                start=pd.to_datetime(hourly.Time(), unit="s", utc=True),
-                end=pd.to_datetime(hourly.TimeEnd(), unit="s", utc=True),
-                freq=pd.Timedelta(seconds=hourly.Interval()),
-                inclusive="left"
+    # Lazy %-formatting keeps disabled log levels free on the hot path
+    logger.info("Fetched data for %s, %s", latitude, longitude)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            f"Coordinates: {response.Latitude()}°N, {response.Longitude()}°E, "
+            f"elevation {response.Elevation()} m asl, "
+            f"timezone {response.Timezone()} {response.TimezoneAbbreviation()}, "
+            f"UTC offset {response.UtcOffsetSeconds()} s"
+        )
+
+    remember_forecast(latitude, longitude, projection, forecast)
+    return forecast
+
+
+def fetch_forecast(latitude, longitude, variables=None, forecast_days=None, forecast_hours=None,
+                   force_refresh=False, cached_only=False, budget=None):
+    # Only the requested variables and horizon are downloaded, decoded and cached.
+    # budget (seconds) bounds waiting on other fetches, rate limiting, retries and the request itself
+    projection = make_projection(variables, forecast_days, forecast_hours)
+    latitude, longitude = resolve_location(latitude, longitude)
+
+    # Parsed forecasts are served from memory until TTL expiry or the next model run
+    key = forecast_key(latitude, longitude, projection)
+    if not force_refresh:
+        forecast = forecast_cache.get(key)
+        if forecast is not None:
+            return forecast
+
+    try:
+        with deadline(budget):
+            if cached_only:
+                return _fetch_and_parse(latitude, longitude, key, projection, cached_only=True)
+            # Concurrent callers for the same location and projection share one upstream request
+            flight_key = (latitude, longitude, projection, force_refresh)
+            return fetch_flights.do(
+                flight_key, _fetch_and_parse, latitude, longitude, key, projection,
+                force_refresh=force_refresh, timeout=remaining()
             )
-        }
 
-        for i, name in enumerate(variable_names):
-            hourly_data[name] = hourly.Variables(i).ValuesAsNumpy()
+    except (UpstreamUnavailable, TimeoutError) as e:
+        # Fail-fast rejections are expected while upstream is slow or down
+        logger.warning("Skipped fetch for %s, %s: %s", latitude, longitude, e)
+        return None
+    except Exception as e:
+        logger.error(f"Error fetching weather data: {e}")
+        return None
+
+
+def _revalidate(latitude, longitude, projection_kwargs, stale_key):
+    try:
+        fetch_forecast(latitude, longitude, **projection_kwargs)
+    finally:
+        with _revalidating_lock:
+            _revalidating.discard(stale_key)
+
+
+def fetch_forecast_swr(latitude, longitude, variables=None, forecast_days=None, forecast_hours=None,
+                       max_stale=MAX_STALE, budget=FETCH_BUDGET):
+    # Returns ServedForecast(forecast, age_seconds, stale) or None when nothing usable exists.
+    # Only the foreground fetch is held to budget; background revalidation is not
+    projection = make_projection(variables, forecast_days, forecast_hours)
+    projection_kwargs = dict(variables=variables, forecast_days=forecast_days, forecast_hours=forecast_hours)
+    latitude, longitude = resolve_location(latitude, longitude)
+
+    forecast = forecast_cache.get(forecast_key(latitude, longitude, projection))
+    if forecast is not None:
+        return ServedForecast(forecast, forecast.age(), False)
 
-        df = pd.DataFrame(data=hourly_data)
-        # Display selected columns in a more readable format
-        print("\nWeather Forecast:")
-        print(df[['date', 'precipitation_probability', 'cloud_cover', 'relative_humidity_2m', 'weather_code']].head())
-        return df
+    # Expired: hand back the last good forecast now and refresh it in the background
+    stale_key = location_key(latitude, longitude, projection)
+    previous = stale_cache.get(stale_key)
+    if previous is not None and previous.age() <= max_stale:
+        with _revalidating_lock:
+            start_refresh = stale_key not in _revalidating
+            _revalidating.add(stale_key)
+        if start_refresh:
+            _revalidate_executor.submit(_revalidate, latitude, longitude, projection_kwargs, stale_key)
+        return ServedForecast(previous, previous.age(), True)
+
+    forecast = fetch_forecast(latitude, longitude, budget=budget, **projection_kwargs)
+    if forecast is not None:
+        return ServedForecast(forecast, forecast.age(), False)
+
+    # Upstream failed or ran out of budget: anything still held in the stale cache beats an error
+    if previous is not None:
+        logger.warning("Serving stale forecast for %s, %s after upstream error", latitude, longitude)
+        return ServedForecast(previous, previous.age(), True)
+    return None
+
+
+def fetch_weather_data(latitude, longitude, variables=None, forecast_days=None, forecast_hours=None,
+                       force_refresh=False, cached_only=False):
+    # DataFrame view of fetch_forecast for callers that want the full table
+    forecast = fetch_forecast(
+        latitude, longitude, variables=variables, forecast_days=forecast_days,
+        forecast_hours=forecast_hours, force_refresh=force_refresh, cached_only=cached_only
+    )
+    if forecast is None:
+        return None
+    with span('dataframe'):
+        return forecast.to_dataframe()
 
+
+def fetch_forecast_uncached(latitude, longitude, variables=None, forecast_days=None, forecast_hours=None):
+    # One-off reads such as bulk exports: a forecast already in memory is reused, anything else
+    # is fetched without being stored in any cache, index or the store, so exporting the whole
+    # catalog does not evict the forecasts the dashboard is serving
+    from requests_cache import DO_NOT_CACHE
+    projection = make_projection(variables, forecast_days, forecast_hours)
+    latitude, longitude = resolve_location(latitude, longitude)
+    forecast = forecast_cache.get(forecast_key(latitude, longitude, projection), record=False)
+    if forecast is not None:
+        return forecast
+    params = {
+        "latitude": latitude,
+        "longitude": longitude,
+        **projection_params(projection)
+    }
+    try:
+        responses, fetched_at = request_forecasts(params, expire_after=DO_NOT_CACHE)
+        return response_to_forecast(responses[0], projection, fetched_at)
+    except (UpstreamUnavailable, TimeoutError) as e:
+        logger.warning("Skipped fetch for %s, %s: %s", latitude, longitude, e)
+        return None
     except Exception as e:
         logger.error(f"Error fetching weather data: {e}")
-        print(f"Failed to fetch weather data: {e}")
         return None
 
+# --------------------------
+# Batched Multi-Location Fetching
+# --------------------------
+def _chunked(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _fetch_chunk(chunk, projection, force_refresh=False):
+    # One upstream request for the whole chunk; Open-Meteo answers in input order
+    try:
+        params = {
+            "latitude": [lat for lat, _ in chunk],
+            "longitude": [lon for _, lon in chunk],
+            **projection_params(projection)
+        }
+        responses, fetched_at = request_forecasts(params, refresh=force_refresh, expire_after=http_expire_after())
+        logger.info("Fetched batch of %d locations", len(chunk))
+        results = {}
+        for coords, response in zip(chunk, responses):
+            # Each forecast gets its own arrays so it can be evicted without the rest of the batch
+            forecast = response_to_forecast(response, projection, fetched_at, copy=len(responses) > 1)
+            remember_forecast(*coords, projection, forecast)
+            results[coords] = forecast
+        return results
+    except Exception as e:
+        logger.error(f"Error fetching weather batch of {len(chunk)} locations: {e}")
+        return {coords: None for coords in chunk}
+
+
+def fetch_forecast_batch(coords, variables=None, forecast_days=None, forecast_hours=None,
+                         chunk_size=BATCH_SIZE, max_workers=BATCH_WORKERS, force_refresh=False):
+    # Returns {(lat, lon): Forecast or None} for every requested location
+    projection = make_projection(variables, forecast_days, forecast_hours)
+    resolved = {(lat, lon): resolve_location(lat, lon) for lat, lon in coords}
+    forecasts = {}
+    if not force_refresh:
+        for location in set(resolved.values()):
+            forecast = forecast_cache.get(forecast_key(*location, projection))
+            if forecast is not None:
+                forecasts[location] = forecast
+    missing = [location for location in dict.fromkeys(resolved.values()) if location not in forecasts]
+
+    if missing:
+        chunks = list(_chunked(missing, max(1, chunk_size)))
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as executor:
+            for chunk_result in executor.map(lambda chunk: _fetch_chunk(chunk, projection, force_refresh), chunks):
+                forecasts.update(chunk_result)
+    return {requested: forecasts.get(location) for requested, location in resolved.items()}
+
+
+def fetch_weather_batch(coords, variables=None, forecast_days=None, forecast_hours=None,
+                        chunk_size=BATCH_SIZE, max_workers=BATCH_WORKERS, force_refresh=False):
+    # Returns {(lat, lon): DataFrame or None} for every requested location
+    forecasts = fetch_forecast_batch(
+        coords, variables=variables, forecast_days=forecast_days, forecast_hours=forecast_hours,
+        chunk_size=chunk_size, max_workers=max_workers, force_refresh=force_refresh
+    )
+    with span('dataframe'):
+        return {
+            coords: forecast.to_dataframe() if forecast is not None else None
+            for coords, forecast in forecasts.items()
+        }
+
 # --------------------------
 # Main Entry Point
 # --------------------------
 def main():
+    import pandas as pd
+    configure_logging()
+
+    # Set pandas display options to show all columns
+    pd.set_option('display.max_columns', None)
+    pd.set_option('display.width', None)
+    pd.set_option('display.max_rows', 5)
+
     # Berlin coordinates
     latitude = 52.52
     longitude = 13.41
-    fetch_weather_data(latitude, longitude)
+    df = fetch_weather_data(latitude, longitude)
+    if df is None:
+        print("Failed to fetch weather data")
+        return
+
+    # Display selected columns in a more readable format
+    print("Weather Forecast:")
+    print(df[['date', 'precipitation_probability', 'cloud_cover', 'relative_humidity_2m', 'weather_code']].head())
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
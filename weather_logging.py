@@ -0,0 +1,82 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import time
+from contextlib import contextmanager
+
+# --------------------------
+# Logging Configuration
+# --------------------------
+LOG_LEVEL = os.environ.get('WEATHER_LOG_LEVEL', 'WARNING')
+LOG_FILE = os.environ.get('WEATHER_LOG_FILE', 'msba_weather_app.log')
+TIMING_ENABLED = os.environ.get('WEATHER_TIMING', '0') == '1'
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+TIMING_LOGGER = 'weather.timing'
+
+_queue = queue.SimpleQueue()
+_listener = None
+
+
+class TimingFormatter(logging.Formatter):
+    # One JSON object per line so fetch timings can be parsed without regexes
+    def format(self, record):
+        payload = {'ts': round(record.created, 3), 'event': record.getMessage()}
+        payload.update(getattr(record, 'fields', {}))
+        return json.dumps(payload)
+
+
+def configure_logging(level=LOG_LEVEL, filename=LOG_FILE, timing=TIMING_ENABLED):
+    # Handlers run on a listener thread; request threads only enqueue records
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    file_handler = logging.FileHandler(filename, mode='a')
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    handlers = [file_handler]
+
+    timing_logger = logging.getLogger(TIMING_LOGGER)
+    timing_logger.propagate = False
+    if timing:
+        timing_handler = logging.FileHandler(f"{os.path.splitext(filename)[0]}.timing.jsonl", mode='a')
+        timing_handler.setFormatter(TimingFormatter())
+        timing_handler.addFilter(lambda record: record.name == TIMING_LOGGER)
+        file_handler.addFilter(lambda record: record.name != TIMING_LOGGER)
+        handlers.append(timing_handler)
+        timing_logger.setLevel(logging.INFO)
+        timing_logger.addHandler(logging.handlers.QueueHandler(_queue))
+    else:
+        timing_logger.setLevel(logging.CRITICAL + 1)
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(logging.handlers.QueueHandler(_queue))
+
+    _listener = logging.handlers.QueueListener(_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
+
+
+timing_logger = logging.getLogger(TIMING_LOGGER)
+
+
+# --------------------------
+# Per-Fetch Timing Records
+# --------------------------
+@contextmanager
+def timed(event, **fields):
+    # Yields a dict the caller can add fields to; nothing is formatted unless timing is enabled
+    if not timing_logger.isEnabledFor(logging.INFO):
+        yield fields
+        return
+    start = time.perf_counter()
+    try:
+        yield fields
+    finally:
+        fields['duration_ms'] = round((time.perf_counter() - start) * 1000, 3)
+        timing_logger.info(event, extra={'fields': fields})
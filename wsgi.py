@@ -0,0 +1,15 @@
+import os
+from app import server, warmer
+from weather_logging import configure_logging
+
+# --------------------------
+# Production Entry Point
+# --------------------------
+# gunicorn -c gunicorn.conf.py wsgi:server
+# Imported once per worker after the fork, so each worker builds its own HTTP client,
+# logging listener and SQLite connections; debug mode and the reloader are never enabled
+configure_logging()
+
+if os.environ.get('WEATHER_PREWARM', '1') != '0':
+    # Every worker starts a warmer, but with a shared cache only the elected leader refreshes
+    warmer.start()